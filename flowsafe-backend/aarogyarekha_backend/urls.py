@@ -8,7 +8,7 @@ from rest_framework.response import Response
 
 # Import prediction proxy views
 from prediction_proxy import (
-    predict_disease, predict_batch, prediction_info, prediction_health_check
+    predict_disease, predict_batch, predict_grid, prediction_info, prediction_health_check
 )
 
 @api_view(['GET'])
@@ -41,6 +41,7 @@ urlpatterns = [
     # Prediction proxy endpoints
     path('api/predict/', predict_disease, name='predict_disease'),
     path('api/predict/batch/', predict_batch, name='predict_batch'),
+    path('api/predict/grid/', predict_grid, name='predict_grid'),
     path('api/predict/info/', prediction_info, name='prediction_info'),
     path('api/predict/health/', prediction_health_check, name='prediction_health_check'),
 ]
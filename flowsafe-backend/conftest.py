@@ -0,0 +1,58 @@
+"""
+Shared pytest fixtures for the prediction proxy tests
+
+The proxy modules need Django settings and a Redis cache. Minimal settings
+are configured only if nothing configured Django first, and the default
+cache is pointed at an in-memory fakeredis server; with lupa installed it
+also runs the Lua scripts the single-flight lock relies on.
+"""
+
+import pytest
+
+TEST_SETTINGS = dict(
+    SECRET_KEY='prediction-proxy-tests',
+    INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth', 'rest_framework'],
+    DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+)
+
+
+def configure_django():
+    import django
+    from django.conf import settings
+
+    if not settings.configured:
+        settings.configure(**TEST_SETTINGS)
+        django.setup()
+
+
+@pytest.fixture(scope='session')
+def fake_redis_server():
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa', reason='fakeredis needs lupa to run Lua scripts')
+    pytest.importorskip('django_redis')
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def redis_cache(fake_redis_server):
+    """Point Django's default cache at an empty fakeredis server for one test"""
+    import fakeredis
+
+    configure_django()
+    from django.test import override_settings
+    from django_redis import get_redis_connection
+
+    caches = {'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://fakeredis:6379/0',
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'CONNECTION_POOL_KWARGS': {
+                'connection_class': getattr(fakeredis, 'FakeRedisConnection', fakeredis.FakeConnection),
+                'server': fake_redis_server,
+            },
+        },
+    }}
+    with override_settings(CACHES=caches):
+        get_redis_connection('default').flushall()
+        yield
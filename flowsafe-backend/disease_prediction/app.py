@@ -1,11 +1,21 @@
-from flask import Flask, request, jsonify
-import joblib
+from flask import Flask, request, jsonify, Response, stream_with_context, g
+from werkzeug.wsgi import get_input_stream
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
 import os
+import json
 import logging
+import threading
+import time
 from datetime import datetime
+from encoders import UNSEEN_POLICIES
+from model_store import ModelLoader, ModelWatcher, file_sha256
+from prediction_cache import PredictionCache
+from lookup_table import LOOKUP_TABLE_PATH
+from shadow import ShadowEvaluator
+import columnar
+import metrics
+from metrics import STAGE_SECONDS
 
 # Configure logging
 log_level = logging.INFO if os.getenv('DEBUG', 'False').lower() == 'true' else logging.WARNING
@@ -24,101 +34,172 @@ app = Flask(__name__)
 # Configure Flask app
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-# Global variables for model and encoders
-model = None
-label_encoders = None
-le_disease = None
-available_locations = None
-available_weeks = None
+# Feature layout expected by the model (same order as training)
+FEATURE_COLUMNS = ['Week', 'Location', 'NDVI', 'WaterIndex', 'Rainfall_mm',
+                   'Humidity_pct', 'FeverCases', 'Absenteeism_pct', 'ToiletUsage_pct']
+CATEGORICAL_COLUMNS = ['Week', 'Location']
+NUMERIC_COLUMNS = [col for col in FEATURE_COLUMNS if col not in CATEGORICAL_COLUMNS]
+FEATURE_INDEX = {col: i for i, col in enumerate(FEATURE_COLUMNS)}
+
+MODEL_PATH = "xgb_disease_prediction_model.pkl"
+BOOSTER_PATH = "xgb_disease_prediction_model.ubj"
+ENCODER_BUNDLE_PATH = "disease_encoders.json"
+
+# How Week/Location values unseen during training are encoded (see encoders.py)
+UNSEEN_CATEGORY_POLICY = os.getenv('UNSEEN_CATEGORY_POLICY', 'first').lower()
+if UNSEEN_CATEGORY_POLICY not in UNSEEN_POLICIES:
+    raise ValueError(f"UNSEEN_CATEGORY_POLICY must be one of {UNSEEN_POLICIES}")
+
+# Model format: 'booster' loads the native XGBoost model exported by regenerate_model_v2.py,
+# 'sklearn' loads the pickled XGBClassifier (also used when no booster file exists)
+MODEL_FORMAT = os.getenv('MODEL_FORMAT', 'booster').lower()
+if MODEL_FORMAT not in ('booster', 'sklearn'):
+    raise ValueError("MODEL_FORMAT must be 'booster' or 'sklearn'")
+
+# Threads used by each worker for inference (0 keeps the XGBoost default)
+XGB_NTHREAD = int(os.getenv('XGB_NTHREAD', '0'))
+
+# Feature construction: 'numpy' writes records straight into float32 arrays for the
+# booster, 'pandas' keeps the original DataFrame path as a fallback
+FEATURE_PATH = os.getenv('FEATURE_PATH', 'numpy').lower()
+if FEATURE_PATH not in ('numpy', 'pandas'):
+    raise ValueError("FEATURE_PATH must be 'numpy' or 'pandas'")
+
+# Inference backend: 'xgboost' scores with the booster, 'compiled' flattens it into NumPy
+# arrays at load time (see tree_compiler.py) and falls back to XGBoost unless the
+# compiled outputs match the booster's bit for bit
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'xgboost').lower()
+if INFERENCE_BACKEND not in ('xgboost', 'compiled'):
+    raise ValueError("INFERENCE_BACKEND must be 'xgboost' or 'compiled'")
+
+# Prediction result cache (PREDICTION_CACHE_SIZE=0 disables it)
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '10000'))
+PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL', '300'))
+
+# Quantized lookup table: probabilities per cell of the model's split thresholds, served
+# instead of the exact-match cache (LOOKUP_TABLE_SIZE=0 disables it). It is seeded from
+# LOOKUP_TABLE_PATH when that file was generated for the current model
+LOOKUP_TABLE_SIZE = int(os.getenv('LOOKUP_TABLE_SIZE', '0'))
+
+# Hot reload: how often the model and bundle files are checked for a new version
+MODEL_RELOAD = os.getenv('MODEL_RELOAD', 'True').lower() == 'true'
+MODEL_CHECK_INTERVAL = float(os.getenv('MODEL_CHECK_INTERVAL', '5'))
+
+# Columnar bulk uploads: rows decoded and scored per chunk, and the upload size limit
+# that replaces MAX_CONTENT_LENGTH on /predict/bulk (0 means unlimited)
+BULK_CHUNK_ROWS = int(os.getenv('BULK_CHUNK_ROWS', '50000'))
+BULK_MAX_CONTENT_LENGTH = int(os.getenv('BULK_MAX_CONTENT_LENGTH', '0'))
+
+# Rows scored per model call when /predict/batch streams NDJSON
+BATCH_STREAM_CHUNK_ROWS = int(os.getenv('BATCH_STREAM_CHUNK_ROWS', '1000'))
+
+# Shadow evaluation: a candidate model (.ubj/.json booster or .pkl) re-scores this
+# fraction of /predict and /predict/batch records in the background
+SHADOW_MODEL_PATH = os.getenv('SHADOW_MODEL_PATH', '')
+SHADOW_BUNDLE_PATH = os.getenv('SHADOW_BUNDLE_PATH', ENCODER_BUNDLE_PATH)
+SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', '0.1'))
+
+model_loader = ModelLoader(
+    model_path=MODEL_PATH,
+    booster_path=BOOSTER_PATH,
+    bundle_path=ENCODER_BUNDLE_PATH,
+    model_format=MODEL_FORMAT,
+    feature_columns=FEATURE_COLUMNS,
+    categorical_columns=CATEGORICAL_COLUMNS,
+    unseen_policy=UNSEEN_CATEGORY_POLICY,
+    nthread=XGB_NTHREAD,
+    inference_backend=INFERENCE_BACKEND,
+    lookup_table_size=LOOKUP_TABLE_SIZE,
+    lookup_table_path=LOOKUP_TABLE_PATH
+)
+
+# The model, its encoders and version live in one ModelState that is replaced as a
+# single reference, so each request reads it once and never mixes two versions
+model_state = None
+model_watcher = None
+_watcher_lock = threading.Lock()
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+shadow_evaluator = None
+
+def swap_model_state(state):
+    """Atomically start serving a newly loaded model"""
+    global model_state
+    previous = model_state
+    model_state = state
+    # Keys carry the model version, so old entries could never be hit again
+    prediction_cache.clear()
+    if previous is not None:
+        logger.warning(f"Model reloaded: now serving version {state.model_version} "
+                       f"(was {previous.model_version})")
 
 def load_model_and_encoders():
-    """Load the trained model and prepare encoders"""
-    global model, label_encoders, le_disease, available_locations, available_weeks
-    
+    """Load the trained model and its precomputed encoder bundle"""
     try:
-        # Load the trained model
-        model_path = "xgb_disease_prediction_model.pkl"
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"Model file {model_path} not found")
-        
-        model = joblib.load(model_path)
-        logger.info("Model loaded successfully")
-        
-        # Load original data to get encoder information
-        df = pd.read_csv('delhi_disease_data_10000.csv')
-        
-        # Create disease labels based on the same logic used in training
-        def assign_disease(row):
-            # Primary conditions for specific diseases
-            if row['Rainfall_mm'] > 100 and row['FeverCases'] > 25:
-                return 'Dengue'
-            elif row['Humidity_pct'] > 85 and row['ToiletUsage_pct'] < 75:
-                return 'Typhoid'
-            elif row['WaterIndex'] > 0.6 and row['NDVI'] < 0.4:
-                return 'Malaria'
-            elif row['FeverCases'] < 10 and row['Absenteeism_pct'] < 5:
-                return 'Healthy'
-            
-            # Secondary conditions - more relaxed criteria to avoid "Other"
-            elif row['Rainfall_mm'] > 50 and row['FeverCases'] > 15:
-                return 'Dengue'
-            elif row['Humidity_pct'] > 70 and row['ToiletUsage_pct'] < 80:
-                return 'Typhoid'
-            elif row['WaterIndex'] > 0.4 and row['NDVI'] < 0.5:
-                return 'Malaria'
-            elif row['FeverCases'] < 15 and row['Absenteeism_pct'] < 10:
-                return 'Healthy'
-            
-            # Tertiary conditions - even more relaxed to capture remaining cases
-            elif row['FeverCases'] > 20 or row['Rainfall_mm'] > 75:
-                return 'Dengue'
-            elif row['Humidity_pct'] > 80 or row['ToiletUsage_pct'] < 70:
-                return 'Typhoid'
-            elif row['WaterIndex'] > 0.5 or row['NDVI'] < 0.6:
-                return 'Malaria'
-            else:
-                return 'Healthy'  # Default to Healthy instead of Other
-        
-        df['Disease'] = df.apply(assign_disease, axis=1)
-        
-        # Recreate the label encoders used during training
-        label_encoders = {}
-        for col in ['Week', 'Location']:
-            le = LabelEncoder()
-            le.fit(df[col])
-            label_encoders[col] = le
-        
-        # Disease label encoder
-        le_disease = LabelEncoder()
-        le_disease.fit(df['Disease'])
-        
-        # Store available values
-        available_locations = sorted(df['Location'].unique().tolist())
-        available_weeks = sorted(df['Week'].unique().tolist())
-        
-        logger.info("Encoders initialized successfully")
-        
+        state = model_loader.load()
+        swap_model_state(state)
+        logger.info(f"Model loaded successfully ({state.model_format} format, "
+                    f"version {state.model_version})")
     except Exception as e:
         logger.error(f"Error loading model and encoders: {str(e)}")
         raise
 
-def preprocess_input(data):
+def ensure_model_watcher():
+    """Start the reload watcher once per process, since threads do not survive a fork"""
+    global model_watcher
+    if not MODEL_RELOAD or (model_watcher is not None and model_watcher.pid == os.getpid()):
+        return
+    with _watcher_lock:
+        if model_watcher is None or model_watcher.pid != os.getpid():
+            model_watcher = ModelWatcher(
+                model_loader, lambda: model_state, swap_model_state, MODEL_CHECK_INTERVAL
+            )
+            model_watcher.start()
+
+def load_shadow_model():
+    """Load the candidate model for shadow evaluation, if one is configured"""
+    global shadow_evaluator
+    if not SHADOW_MODEL_PATH or SHADOW_SAMPLE_RATE <= 0:
+        return
+    
+    shadow_loader = ModelLoader(
+        model_path=SHADOW_MODEL_PATH,
+        booster_path=SHADOW_MODEL_PATH,
+        bundle_path=SHADOW_BUNDLE_PATH,
+        model_format='sklearn' if SHADOW_MODEL_PATH.endswith('.pkl') else 'booster',
+        feature_columns=FEATURE_COLUMNS,
+        categorical_columns=CATEGORICAL_COLUMNS,
+        unseen_policy=UNSEEN_CATEGORY_POLICY,
+        nthread=XGB_NTHREAD,
+        verify_model=False
+    )
+    try:
+        state = shadow_loader.load()
+    except Exception as e:
+        # A broken candidate must never take the primary service down
+        logger.error(f"Shadow model not loaded, shadow evaluation disabled: {str(e)}")
+        return
+    
+    # The shadow may share the primary's bundle, so version it by its own model file
+    state.model_version = file_sha256(state.model_path)[:12]
+    shadow_evaluator = ShadowEvaluator(state, build_feature_matrix, predict_backend, SHADOW_SAMPLE_RATE)
+    logger.info(f"Shadow model {SHADOW_MODEL_PATH} loaded, sampling {SHADOW_SAMPLE_RATE:.0%} of records")
+
+def submit_shadow(data_list, state):
+    """Hand validated records to the shadow model, if one is configured"""
+    if shadow_evaluator is not None:
+        shadow_evaluator.submit(data_list, state)
+
+def preprocess_input(data, state):
     """Preprocess input data for prediction"""
     try:
         # Create DataFrame from input
         df = pd.DataFrame([data])
         
-        # Encode categorical features
-        for col in ['Week', 'Location']:
+        # Encode categorical features (unseen values follow UNSEEN_CATEGORY_POLICY)
+        for col in CATEGORICAL_COLUMNS:
             if col in df.columns:
-                if col in label_encoders:
-                    # Handle unseen categories
-                    try:
-                        df[col] = label_encoders[col].transform(df[col])
-                    except ValueError:
-                        # If unseen category, use the most common one
-                        df[col] = 0  # Default to first category
-                        logger.warning(f"Unseen category in {col}, using default")
+                df[col] = state.label_encoders[col].encode(data[col])
         
         # Ensure correct column order (same as training)
         expected_columns = ['Week', 'Location', 'NDVI', 'WaterIndex', 'Rainfall_mm', 
@@ -133,21 +214,372 @@ def preprocess_input(data):
         logger.error(f"Error preprocessing input: {str(e)}")
         raise
 
+def validate_input(data, state):
+    """Return an error message if a record cannot be scored, otherwise None"""
+    if not isinstance(data, dict):
+        return "Record must be a JSON object"
+    
+    missing_fields = [field for field in FEATURE_COLUMNS if field not in data]
+    if missing_fields:
+        return f"Missing required fields: {missing_fields}"
+    
+    for field in NUMERIC_COLUMNS:
+        try:
+            float(data[field])
+        except (TypeError, ValueError):
+            return f"Invalid numeric value for {field}: {data[field]!r}"
+    
+    for col in CATEGORICAL_COLUMNS:
+        encoder = state.label_encoders[col]
+        if not encoder.known(data[col]):
+            metrics.UNSEEN_CATEGORIES.inc(column=col)
+            if encoder.unseen_policy == 'error':
+                return f"Unseen category in {col}: {data[col]!r}"
+    
+    return None
+
+def preprocess_batch(data_list, state):
+    """Encode a list of validated records into a single feature frame"""
+    df = pd.DataFrame(data_list, columns=FEATURE_COLUMNS)
+    
+    # Encode categorical features column-wise with the precomputed code maps
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = state.label_encoders[col].encode_many(df[col].tolist())
+    
+    df[NUMERIC_COLUMNS] = df[NUMERIC_COLUMNS].astype(float)
+    return df
+
+# Per-thread preallocated row for single predictions
+_feature_buffers = threading.local()
+
+def build_feature_vector(data, state):
+    """Write a validated record into a preallocated float32 row in FEATURE_COLUMNS order"""
+    row = getattr(_feature_buffers, 'row', None)
+    if row is None:
+        row = _feature_buffers.row = np.empty((1, len(FEATURE_COLUMNS)), dtype=np.float32)
+    
+    for col in CATEGORICAL_COLUMNS:
+        row[0, FEATURE_INDEX[col]] = state.label_encoders[col].encode(data[col])
+    for col in NUMERIC_COLUMNS:
+        row[0, FEATURE_INDEX[col]] = float(data[col])
+    return row
+
+def build_feature_matrix(data_list, state):
+    """Encode a list of validated records into a float32 feature matrix"""
+    features = np.empty((len(data_list), len(FEATURE_COLUMNS)), dtype=np.float32)
+    
+    for col in CATEGORICAL_COLUMNS:
+        features[:, FEATURE_INDEX[col]] = state.label_encoders[col].encode_many([data[col] for data in data_list])
+    for col in NUMERIC_COLUMNS:
+        features[:, FEATURE_INDEX[col]] = np.fromiter(
+            (float(data[col]) for data in data_list), dtype=np.float64, count=len(data_list)
+        )
+    return features
+
+def infer(features, state):
+    """Class probabilities for a float32 feature matrix, from the compiled evaluator or the booster"""
+    if state.compiled_model is not None:
+        return state.compiled_model.predict(features)
+    return state.booster.inplace_predict(features, validate_features=False)
+
+def predict_matrix(features, state):
+    """Class probabilities for a float32 feature matrix, straight from the model"""
+    with STAGE_SECONDS.time(stage='inference'):
+        return infer(features, state)
+
+def predict_backend(features, state):
+    """Class probabilities from the backend that serves state, without the exact-match cache or metrics
+
+    Used by shadow evaluation to time the primary the way production scores it.
+    """
+    if state.lookup_table is not None:
+        return state.lookup_table.predict(features, lambda rows: infer(rows, state))
+    return infer(features, state)
+
+def predict_cached(features, state):
+    """Class probabilities for a feature matrix, scoring only rows missing from the cache"""
+    if state.lookup_table is not None:
+        return state.lookup_table.predict(features, lambda rows: predict_matrix(rows, state))
+    if not prediction_cache.enabled:
+        return predict_matrix(features, state)
+    
+    keys = [(state.model_version, row.tobytes()) for row in features]
+    cached = prediction_cache.get_many(keys)
+    missing = [i for i, value in enumerate(cached) if value is None]
+    if not missing:
+        return np.vstack(cached)
+    
+    scored = predict_matrix(features[missing], state)
+    prediction_proba = np.empty((len(features), scored.shape[1]), dtype=scored.dtype)
+    for i, value in enumerate(cached):
+        if value is not None:
+            prediction_proba[i] = value
+    prediction_proba[missing] = scored
+    prediction_cache.put_many((keys[i], scored[j].copy()) for j, i in enumerate(missing))
+    return prediction_proba
+
+def score_record(data, state):
+    """Class probabilities for one validated record"""
+    with STAGE_SECONDS.time(stage='preprocess'):
+        if FEATURE_PATH == 'pandas':
+            features = preprocess_input(data, state).to_numpy(dtype=np.float32)
+        else:
+            features = build_feature_vector(data, state)
+    
+    return predict_cached(features, state)[0]
+
+def score_records(data_list, state):
+    """Class probabilities for a list of validated records, in one model call"""
+    with STAGE_SECONDS.time(stage='preprocess'):
+        if FEATURE_PATH == 'pandas':
+            features = preprocess_batch(data_list, state).to_numpy(dtype=np.float32)
+        else:
+            features = build_feature_matrix(data_list, state)
+    
+    return predict_cached(features, state)
+
+def format_prediction(prediction_proba, state):
+    """Build the prediction payload for one row of class probabilities"""
+    best = int(np.argmax(prediction_proba))
+    probabilities = {
+        class_name: float(prediction_proba[i])
+        for i, class_name in enumerate(state.le_disease.classes_)
+    }
+    return {
+        "prediction": state.le_disease.classes_[best],
+        "confidence": float(prediction_proba[best]),
+        "probabilities": probabilities
+    }
+
+def score_bulk_frame(frame, offset, state):
+    """Encode and score one chunk of a columnar upload, flagging invalid rows"""
+    missing_fields = [field for field in FEATURE_COLUMNS if field not in frame.columns]
+    if missing_fields:
+        raise ValueError(f"Missing required columns: {missing_fields}")
+    
+    n_rows = len(frame)
+    errors = np.full(n_rows, None, dtype=object)
+    
+    numeric = {}
+    for col in NUMERIC_COLUMNS:
+        values = pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=np.float64)
+        # Empty cells are errors too: /predict and /predict/batch require every field
+        missing = frame[col].isna().to_numpy()
+        errors[missing & pd.isna(errors)] = f"Missing value for {col}"
+        errors[np.isnan(values) & pd.isna(errors)] = f"Invalid numeric value for {col}"
+        numeric[col] = values
+    
+    for col in CATEGORICAL_COLUMNS:
+        encoder = state.label_encoders[col]
+        unseen = encoder.unseen_mask(frame[col].tolist())
+        if unseen.any():
+            metrics.UNSEEN_CATEGORIES.inc(int(unseen.sum()), column=col)
+        if encoder.unseen_policy == 'error':
+            errors[unseen & pd.isna(errors)] = f"Unseen category in {col}"
+    
+    # Only rows without errors are encoded and scored
+    valid = pd.isna(errors)
+    with STAGE_SECONDS.time(stage='preprocess'):
+        features = np.empty((int(valid.sum()), len(FEATURE_COLUMNS)), dtype=np.float32)
+        for col in CATEGORICAL_COLUMNS:
+            features[:, FEATURE_INDEX[col]] = state.label_encoders[col].encode_many(frame[col].to_numpy()[valid].tolist())
+        for col in NUMERIC_COLUMNS:
+            features[:, FEATURE_INDEX[col]] = numeric[col][valid]
+    
+    classes = state.le_disease.classes_
+    prediction_proba = np.full((n_rows, len(classes)), np.nan, dtype=np.float32)
+    if len(features):
+        prediction_proba[valid] = predict_matrix(features, state)
+    
+    best = np.argmax(np.nan_to_num(prediction_proba, nan=-1.0), axis=1)
+    result = pd.DataFrame({
+        'index': np.arange(offset, offset + n_rows, dtype=np.int64),
+        'prediction': np.where(valid, classes[best], None),
+        'confidence': prediction_proba[np.arange(n_rows), best]
+    })
+    for j, class_name in enumerate(classes):
+        result[f'prob_{class_name}'] = prediction_proba[:, j]
+    result['error'] = errors
+    return result
+
+def iter_bulk_results(content_type, stream, state):
+    """Decode, score and re-encode a columnar upload one chunk at a time
+
+    Errors before the first chunk is yielded are raised, so the caller can still
+    answer with an error status. Later errors end the body with the writer's
+    error trailer instead of cutting it off.
+    """
+    classes = state.le_disease.classes_.tolist()
+    if content_type == columnar.NPY:
+        # Raw matrices are already encoded in FEATURE_COLUMNS order
+        n_rows, dtype = columnar.read_npy_header(stream, len(FEATURE_COLUMNS))
+        writer = columnar.NpyResultWriter(n_rows, len(classes))
+        chunks = (
+            predict_matrix(chunk.astype(np.float32), state)
+            for chunk in columnar.iter_npy_chunks(stream, BULK_CHUNK_ROWS, n_rows, dtype, len(FEATURE_COLUMNS))
+        )
+    else:
+        if content_type == columnar.CSV:
+            writer = columnar.CsvResultWriter(classes)
+            frames = columnar.iter_csv_chunks(stream, BULK_CHUNK_ROWS, CATEGORICAL_COLUMNS)
+        else:
+            writer = columnar.ArrowResultWriter(classes)
+            frames = columnar.iter_arrow_chunks(stream, BULK_CHUNK_ROWS)
+        
+        def score_frames():
+            offset = 0
+            for frame in frames:
+                yield score_bulk_frame(frame, offset, state)
+                offset += len(frame)
+        chunks = score_frames()
+    
+    started = False
+    try:
+        for chunk in chunks:
+            yield writer.write(chunk)
+            started = True
+    except Exception as e:
+        if not started:
+            raise
+        # Headers are already sent, so report the failure as the last record
+        logger.error(f"Error during bulk prediction stream: {str(e)}")
+        yield writer.fail(str(e))
+        return
+    
+    yield writer.close()
+
+def validate_grid_request(request_data, state):
+    """Return (locations, weeks, numeric inputs per location) for a grid request, or an error message"""
+    if not isinstance(request_data, dict):
+        return "Request must be a JSON object"
+    
+    inputs = request_data.get('inputs')
+    if not isinstance(inputs, dict):
+        return "Missing 'inputs' object with the shared numeric features"
+    overrides = request_data.get('overrides') or {}
+    if not isinstance(overrides, dict) or not all(isinstance(v, dict) for v in overrides.values()):
+        return "'overrides' must map locations to objects of numeric features"
+    
+    axes = {}
+    for key, col, available in (('locations', 'Location', state.available_locations),
+                                ('weeks', 'Week', state.available_weeks)):
+        values = request_data.get(key, available)
+        if not isinstance(values, list) or not values:
+            return f"'{key}' must be a non-empty list"
+        unknown = [v for v in values if not state.label_encoders[col].known(v)]
+        if unknown:
+            return f"Unknown {key}: {unknown}"
+        axes[key] = values
+    
+    unknown = [loc for loc in overrides if not state.label_encoders['Location'].known(loc)]
+    if unknown:
+        return f"Unknown locations in overrides: {unknown}"
+    
+    missing_fields = [field for field in NUMERIC_COLUMNS if field not in inputs]
+    if missing_fields:
+        return f"Missing required fields in inputs: {missing_fields}"
+    
+    numeric = np.empty((len(axes['locations']), len(NUMERIC_COLUMNS)), dtype=np.float32)
+    for i, location in enumerate(axes['locations']):
+        values = dict(inputs, **overrides.get(location, {}))
+        for j, field in enumerate(NUMERIC_COLUMNS):
+            try:
+                numeric[i, j] = float(values[field])
+            except (TypeError, ValueError):
+                return f"Invalid numeric value for {field} at {location}: {values[field]!r}"
+    
+    return axes['locations'], axes['weeks'], numeric
+
+def build_grid_features(locations, weeks, numeric, state):
+    """Feature matrix of the locations x weeks cross product, one row per (location, week)"""
+    features = np.empty((len(locations), len(weeks), len(FEATURE_COLUMNS)), dtype=np.float32)
+    features[:, :, FEATURE_INDEX['Location']] = state.label_encoders['Location'].encode_many(locations)[:, None]
+    features[:, :, FEATURE_INDEX['Week']] = state.label_encoders['Week'].encode_many(weeks)[None, :]
+    features[:, :, [FEATURE_INDEX[col] for col in NUMERIC_COLUMNS]] = numeric[:, None, :]
+    return features.reshape(-1, len(FEATURE_COLUMNS))
+
+def iter_batch_results(data_list, state, include_input=True, chunk_rows=None):
+    """Yield batch results in input order, scoring chunk_rows records per model call"""
+    chunk_rows = chunk_rows or max(len(data_list), 1)
+    
+    for start in range(0, len(data_list), chunk_rows):
+        chunk = data_list[start:start + chunk_rows]
+        results = [None] * len(chunk)
+        valid_rows = []
+        
+        # Validate every row first so invalid rows keep their own error entry
+        with STAGE_SECONDS.time(stage='validate'):
+            for row, data in enumerate(chunk):
+                error = validate_input(data, state)
+                if error:
+                    results[row] = {"index": start + row, "error": error}
+                    if include_input:
+                        results[row]["input_data"] = data
+                else:
+                    valid_rows.append(row)
+        
+        if valid_rows:
+            # Encode all valid rows of the chunk at once and score them in one model call
+            valid_data = [chunk[row] for row in valid_rows]
+            prediction_proba = score_records(valid_data, state)
+            submit_shadow(valid_data, state)
+            
+            for proba, row in zip(prediction_proba, valid_rows):
+                result = {"index": start + row}
+                result.update(format_prediction(proba, state))
+                if include_input:
+                    result["input_data"] = chunk[row]
+                results[row] = result
+        
+        yield from results
+
 # Initialize model and encoders when app starts
 load_model_and_encoders()
+load_shadow_model()
+
+@app.before_request
+def start_model_watcher():
+    ensure_model_watcher()
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    # Streamed responses are measured up to their first byte
+    if request.url_rule is not None and 'request_start' in g:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, endpoint=request.url_rule.rule)
+    return response
+
+def parse_json_body():
+    """Parse the request body, recording the time spent decoding JSON"""
+    with STAGE_SECONDS.time(stage='parse'):
+        return request.get_json()
+
+def json_response(payload):
+    """jsonify a payload, recording the time spent serializing it"""
+    with STAGE_SECONDS.time(stage='serialize'):
+        return jsonify(payload)
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     try:
+        state = model_state
         return jsonify({
             "status": "healthy",
             "service": "disease-prediction-ml",
             "version": "1.0.0",
-            "model_loaded": model is not None,
-            "encoders_loaded": label_encoders is not None,
-            "available_locations": len(available_locations) if available_locations else 0,
-            "available_weeks": len(available_weeks) if available_weeks else 0,
+            "model_loaded": state is not None,
+            "model_format": state.model_format,
+            "inference_backend": state.inference_backend,
+            "model_version": state.model_version,
+            "model_loaded_at": state.loaded_at,
+            "model_reload": {"enabled": MODEL_RELOAD, "check_interval_seconds": MODEL_CHECK_INTERVAL},
+            "encoders_loaded": state.label_encoders is not None,
+            "prediction_cache": prediction_cache.stats(),
+            "lookup_table": state.lookup_table.stats() if state.lookup_table is not None else None,
+            "shadow_model": SHADOW_MODEL_PATH if shadow_evaluator is not None else None,
+            "available_locations": len(state.available_locations),
+            "available_weeks": len(state.available_weeks),
             "timestamp": datetime.now().isoformat(),
             "environment": os.getenv('FLASK_ENV', 'production')
         }), 200
@@ -159,13 +591,27 @@ def health():
             "timestamp": datetime.now().isoformat()
         }), 500
 
+@app.route('/health/shadow', methods=['GET'])
+def shadow_stats():
+    """Agreement and latency of the shadow model against the primary, for this worker"""
+    if shadow_evaluator is None:
+        return jsonify({"enabled": False})
+    
+    stats = shadow_evaluator.stats()
+    stats["enabled"] = True
+    stats["model_path"] = SHADOW_MODEL_PATH
+    stats["primary_model_version"] = model_state.model_version
+    return jsonify(stats)
+
 @app.route('/info', methods=['GET'])
 def info():
     """Get information about available locations, weeks, and possible predictions"""
+    state = model_state
     return jsonify({
-        "available_locations": available_locations,
-        "available_weeks": available_weeks,
-        "possible_predictions": le_disease.classes_.tolist(),
+        "available_locations": state.available_locations,
+        "available_weeks": state.available_weeks,
+        "possible_predictions": state.le_disease.classes_.tolist(),
+        "model_version": state.model_version,
         "model_features": ['Week', 'Location', 'NDVI', 'WaterIndex', 'Rainfall_mm', 
                           'Humidity_pct', 'FeverCases', 'Absenteeism_pct', 'ToiletUsage_pct']
     })
@@ -175,40 +621,28 @@ def predict():
     """Single prediction endpoint"""
     try:
         # Get JSON data
-        data = request.get_json()
+        data = parse_json_body()
         
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
-        # Validate required fields
-        required_fields = ['Week', 'Location', 'NDVI', 'WaterIndex', 'Rainfall_mm', 
-                          'Humidity_pct', 'FeverCases', 'Absenteeism_pct', 'ToiletUsage_pct']
-        
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-            return jsonify({"error": f"Missing required fields: {missing_fields}"}), 400
-        
-        # Preprocess input
-        processed_data = preprocess_input(data)
+        # Use one model version for the whole request
+        state = model_state
         
-        # Make prediction
-        prediction = model.predict(processed_data)[0]
-        prediction_proba = model.predict_proba(processed_data)[0]
+        # Validate required fields, numeric values and categories
+        with STAGE_SECONDS.time(stage='validate'):
+            error = validate_input(data, state)
+        if error:
+            return jsonify({"error": error}), 400
         
-        # Convert prediction back to disease name
-        disease_name = le_disease.inverse_transform([prediction])[0]
+        # Preprocess input and make prediction
+        prediction_proba = score_record(data, state)
+        submit_shadow([data], state)
         
-        # Create probability dictionary
-        probabilities = {}
-        for i, class_name in enumerate(le_disease.classes_):
-            probabilities[class_name] = float(prediction_proba[i])
-        
-        return jsonify({
-            "prediction": disease_name,
-            "confidence": float(max(prediction_proba)),
-            "probabilities": probabilities,
-            "input_data": data
-        })
+        result = format_prediction(prediction_proba, state)
+        result["model_version"] = state.model_version
+        result["input_data"] = data
+        return json_response(result)
         
     except Exception as e:
         logger.error(f"Error during prediction: {str(e)}")
@@ -219,7 +653,7 @@ def predict_batch():
     """Batch prediction endpoint"""
     try:
         # Get JSON data
-        request_data = request.get_json()
+        request_data = parse_json_body()
         
         if not request_data or 'data' not in request_data:
             return jsonify({"error": "No data provided or missing 'data' field"}), 400
@@ -229,63 +663,128 @@ def predict_batch():
         if not isinstance(data_list, list):
             return jsonify({"error": "Data must be a list"}), 400
         
-        results = []
+        metrics.BATCH_SIZE.observe(len(data_list), source='batch')
+        state = model_state
+        include_input = request_data.get('include_input', True) is not False
+        stream = (request_data.get('stream') is True
+                  or request.accept_mimetypes.best == 'application/x-ndjson')
+        
+        if stream:
+            # One JSON result per line, written as each chunk of rows is scored
+            def generate():
+                successful = 0
+                try:
+                    for result in iter_batch_results(data_list, state, include_input, BATCH_STREAM_CHUNK_ROWS):
+                        successful += "error" not in result
+                        yield json.dumps(result) + "\n"
+                except Exception as e:
+                    # Headers are already sent, so report the failure as the last line
+                    logger.error(f"Error during streamed batch prediction: {str(e)}")
+                    yield json.dumps({
+                        "error": str(e),
+                        "total_predictions": len(data_list),
+                        "successful_predictions": successful,
+                        "model_version": state.model_version
+                    }) + "\n"
+                    return
+                yield json.dumps({
+                    "total_predictions": len(data_list),
+                    "successful_predictions": successful,
+                    "model_version": state.model_version
+                }) + "\n"
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
         
-        for i, data in enumerate(data_list):
-            try:
-                # Validate required fields
-                required_fields = ['Week', 'Location', 'NDVI', 'WaterIndex', 'Rainfall_mm', 
-                                  'Humidity_pct', 'FeverCases', 'Absenteeism_pct', 'ToiletUsage_pct']
-                
-                missing_fields = [field for field in required_fields if field not in data]
-                if missing_fields:
-                    results.append({
-                        "index": i,
-                        "error": f"Missing required fields: {missing_fields}",
-                        "input_data": data
-                    })
-                    continue
-                
-                # Preprocess input
-                processed_data = preprocess_input(data)
-                
-                # Make prediction
-                prediction = model.predict(processed_data)[0]
-                prediction_proba = model.predict_proba(processed_data)[0]
-                
-                # Convert prediction back to disease name
-                disease_name = le_disease.inverse_transform([prediction])[0]
-                
-                # Create probability dictionary
-                probabilities = {}
-                for j, class_name in enumerate(le_disease.classes_):
-                    probabilities[class_name] = float(prediction_proba[j])
-                
-                results.append({
-                    "index": i,
-                    "prediction": disease_name,
-                    "confidence": float(max(prediction_proba)),
-                    "probabilities": probabilities,
-                    "input_data": data
-                })
-                
-            except Exception as e:
-                results.append({
-                    "index": i,
-                    "error": str(e),
-                    "input_data": data
-                })
+        # Score the whole payload in a single model call
+        results = list(iter_batch_results(data_list, state, include_input))
         
-        return jsonify({
+        return json_response({
             "results": results,
             "total_predictions": len(results),
-            "successful_predictions": len([r for r in results if "error" not in r])
+            "successful_predictions": len([r for r in results if "error" not in r]),
+            "model_version": state.model_version
         })
         
     except Exception as e:
         logger.error(f"Error during batch prediction: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/predict/grid', methods=['POST'])
+def predict_grid():
+    """Risk grid endpoint: score every location x week combination in one call"""
+    try:
+        request_data = parse_json_body()
+        
+        if not request_data:
+            return jsonify({"error": "No data provided"}), 400
+        
+        state = model_state
+        
+        with STAGE_SECONDS.time(stage='validate'):
+            grid = validate_grid_request(request_data, state)
+        if isinstance(grid, str):
+            return jsonify({"error": grid}), 400
+        locations, weeks, numeric = grid
+        
+        metrics.BATCH_SIZE.observe(len(locations) * len(weeks), source='grid')
+        with STAGE_SECONDS.time(stage='preprocess'):
+            features = build_grid_features(locations, weeks, numeric, state)
+        prediction_proba = predict_cached(features, state).reshape(len(locations), len(weeks), -1)
+        
+        # Matrices are indexed [location][week]; predictions index into "classes"
+        result = {
+            "locations": locations,
+            "weeks": weeks,
+            "classes": state.le_disease.classes_.tolist(),
+            "model_version": state.model_version,
+            "prediction": prediction_proba.argmax(axis=2).tolist(),
+            "confidence": prediction_proba.max(axis=2).tolist()
+        }
+        if request_data.get('include_probabilities', True) is not False:
+            result["probabilities"] = {
+                class_name: prediction_proba[:, :, j].tolist()
+                for j, class_name in enumerate(result["classes"])
+            }
+        return json_response(result)
+        
+    except Exception as e:
+        logger.error(f"Error during grid prediction: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/predict/bulk', methods=['POST'])
+def predict_bulk():
+    """Columnar bulk prediction endpoint (CSV, Arrow IPC stream or .npy)"""
+    content_type = request.mimetype
+    if content_type not in columnar.SUPPORTED_FORMATS:
+        return jsonify({
+            "error": f"Unsupported content type, use one of {list(columnar.SUPPORTED_FORMATS)}"
+        }), 415
+    
+    stream = get_input_stream(request.environ, max_content_length=BULK_MAX_CONTENT_LENGTH or None)
+    results = iter_bulk_results(content_type, stream, model_state)
+    
+    try:
+        # Decode the header and first chunk up front so format errors still get a 400
+        first_chunk = next(results)
+    except StopIteration:
+        first_chunk = b''
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error during bulk prediction: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    
+    def generate():
+        yield first_chunk
+        yield from results
+    
+    return Response(stream_with_context(generate()), mimetype=content_type)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of the latency histograms and counters of every worker"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({"error": "Endpoint not found"}), 404
@@ -297,7 +796,7 @@ def internal_error(error):
 if __name__ == '__main__':
     try:
         # Ensure model is loaded before starting server
-        if model is None:
+        if model_state is None:
             logger.error("Model failed to load. Exiting.")
             exit(1)
         
@@ -306,8 +805,8 @@ if __name__ == '__main__':
         
         logger.info(f"Starting Flask ML service on port {port}")
         logger.info(f"Debug mode: {debug_mode}")
-        logger.info(f"Model loaded: {model is not None}")
-        logger.info(f"Available locations: {len(available_locations) if available_locations else 0}")
+        logger.info(f"Model loaded: {model_state.model_version} ({model_state.model_format} format)")
+        logger.info(f"Available locations: {len(model_state.available_locations)}")
         
         app.run(debug=debug_mode, host='0.0.0.0', port=port)
     except Exception as e:
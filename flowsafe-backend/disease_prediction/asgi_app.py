@@ -0,0 +1,198 @@
+"""
+ASGI entry point for the disease prediction service
+
+Concurrent single /predict requests are queued for a few milliseconds and
+scored together in one vectorized model call. Every other route is served by
+the Flask app from app.py.
+
+Run with:
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi_app:app
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+import app as prediction_app
+import metrics
+from metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# How long the first queued request may wait for others, and the largest batch scored at once
+MICROBATCH_MAX_WAIT_MS = float(os.getenv('MICROBATCH_MAX_WAIT_MS', '5'))
+MICROBATCH_MAX_SIZE = int(os.getenv('MICROBATCH_MAX_SIZE', '64'))
+
+
+class InvalidRecordError(ValueError):
+    """A queued record failed validation against the batch's model state"""
+
+
+def validate_and_score(records, state):
+    """Validate records against one model state and score the valid ones in one call"""
+    with STAGE_SECONDS.time(stage='validate'):
+        errors = [prediction_app.validate_input(data, state) for data in records]
+    valid = [data for data, error in zip(records, errors) if error is None]
+    prediction_proba = prediction_app.score_records(valid, state) if valid else []
+    return errors, prediction_proba
+
+
+class MicroBatcher:
+    """Collect concurrent single predictions and score them in one model call"""
+
+    def __init__(self, max_wait_ms, max_size):
+        self.max_wait = max_wait_ms / 1000
+        self.max_size = max_size
+        self.batches = 0
+        self.records = 0
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    async def submit(self, data):
+        """Queue one raw record and wait for (class probabilities, model state)
+
+        The record is validated against the same model state that scores it;
+        an invalid record raises InvalidRecordError.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((data, future))
+        return await future
+
+    async def _collect(self):
+        """Wait for one item, then gather more until the batch is full or the wait expires"""
+        loop = asyncio.get_running_loop()
+        items = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(items) < self.max_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return items
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            # Requests whose clients went away no longer need an answer
+            items = [(data, future) for data, future in items if not future.done()]
+            if not items:
+                continue
+
+            try:
+                # The whole batch is validated, scored and formatted with one model version
+                state = prediction_app.model_state
+                records = [data for data, _ in items]
+                # Score off the event loop so new requests keep queueing meanwhile
+                errors, prediction_proba = await loop.run_in_executor(
+                    None, validate_and_score, records, state
+                )
+
+                self.batches += 1
+                self.records += len(items)
+                metrics.BATCH_SIZE.observe(len(items), source='microbatch')
+                prediction_app.submit_shadow(
+                    [data for data, error in zip(records, errors) if error is None], state
+                )
+
+                scored = iter(prediction_proba)
+                for (_, future), error in zip(items, errors):
+                    proba = next(scored) if error is None else None
+                    if future.done():
+                        continue
+                    if error is None:
+                        future.set_result((proba, state))
+                    else:
+                        future.set_exception(InvalidRecordError(error))
+            except Exception as e:
+                # Fail this batch's requests but keep serving the ones queued behind it
+                logger.error(f"Error during micro-batch prediction: {str(e)}")
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+batcher = MicroBatcher(MICROBATCH_MAX_WAIT_MS, MICROBATCH_MAX_SIZE)
+
+
+async def predict(request):
+    """Single prediction endpoint, scored through the micro-batcher"""
+    start = time.perf_counter()
+    try:
+        body = await request.body()
+        try:
+            with STAGE_SECONDS.time(stage='parse'):
+                data = json.loads(body)
+        except ValueError:
+            return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+
+        if not data:
+            return JSONResponse({"error": "No data provided"}, status_code=400)
+
+        try:
+            prediction_proba, state = await batcher.submit(data)
+        except InvalidRecordError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        result = prediction_app.format_prediction(prediction_proba, state)
+        result["model_version"] = state.model_version
+        result["input_data"] = data
+        with STAGE_SECONDS.time(stage='serialize'):
+            response = JSONResponse(result)
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint='/predict')
+        return response
+
+    except Exception as e:
+        logger.error(f"Error during prediction: {str(e)}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def microbatch_stats(request):
+    """Micro-batching counters for this worker"""
+    return JSONResponse({
+        "max_wait_ms": MICROBATCH_MAX_WAIT_MS,
+        "max_batch_size": MICROBATCH_MAX_SIZE,
+        "batches": batcher.batches,
+        "records": batcher.records,
+        "mean_batch_size": round(batcher.records / batcher.batches, 2) if batcher.batches else 0.0
+    })
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    prediction_app.ensure_model_watcher()
+    await batcher.start()
+    yield
+    await batcher.stop()
+
+
+app = Starlette(
+    routes=[
+        Route('/predict', predict, methods=['POST']),
+        Route('/health/microbatch', microbatch_stats, methods=['GET']),
+        Mount('/', app=WSGIMiddleware(prediction_app.app)),
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,180 @@
+"""
+Chunked readers and writers for the columnar bulk prediction endpoint
+
+Uploads are decoded a chunk of rows at a time and results are encoded the same
+way, so memory use does not grow with the size of the upload.
+"""
+
+import io
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow uploads are optional
+    pa = None
+
+CSV = 'text/csv'
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+NPY = 'application/x-npy'
+SUPPORTED_FORMATS = (CSV, ARROW_STREAM, NPY)
+
+
+def require_arrow():
+    if pa is None:
+        raise ValueError("Arrow uploads require the pyarrow package")
+
+
+def iter_csv_chunks(stream, chunk_rows, categorical_columns):
+    """Yield DataFrames of at most chunk_rows rows from a CSV stream"""
+    yield from pd.read_csv(
+        stream,
+        chunksize=chunk_rows,
+        dtype={col: str for col in categorical_columns}
+    )
+
+
+def iter_arrow_chunks(stream, chunk_rows):
+    """Yield DataFrames of at most chunk_rows rows from an Arrow IPC stream"""
+    require_arrow()
+    reader = pa.ipc.open_stream(stream)
+    for batch in reader:
+        for offset in range(0, batch.num_rows, chunk_rows):
+            yield batch.slice(offset, chunk_rows).to_pandas()
+
+
+def read_npy_header(stream, n_features):
+    """Read and check the header of a 2-D float .npy upload, returning (rows, dtype)"""
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    else:
+        raise ValueError(f"Unsupported .npy format version: {version}")
+
+    if fortran_order or len(shape) != 2 or shape[1] != n_features:
+        raise ValueError(f".npy upload must be a C-ordered (rows, {n_features}) matrix")
+    if dtype.kind != 'f':
+        raise ValueError(".npy upload must contain floating point values")
+    return shape[0], dtype
+
+
+def read_exact(stream, size):
+    """Read exactly size bytes from a stream that may return short reads"""
+    parts = []
+    remaining = size
+    while remaining:
+        part = stream.read(remaining)
+        if not part:
+            raise ValueError("Truncated upload")
+        parts.append(part)
+        remaining -= len(part)
+    return b''.join(parts)
+
+
+def iter_npy_chunks(stream, chunk_rows, n_rows, dtype, n_features):
+    """Yield float matrices of at most chunk_rows rows from the body of a .npy stream"""
+    row_bytes = n_features * dtype.itemsize
+    remaining = n_rows
+    while remaining:
+        rows = min(chunk_rows, remaining)
+        buffer = read_exact(stream, rows * row_bytes)
+        yield np.frombuffer(buffer, dtype=dtype).reshape(rows, n_features)
+        remaining -= rows
+
+
+def result_columns(class_names):
+    """Column names of a columnar result chunk"""
+    return (['index', 'prediction', 'confidence']
+            + [f'prob_{name}' for name in class_names] + ['error'])
+
+
+def error_frame(class_names, message):
+    """A result chunk of one row that reports a failure instead of a prediction"""
+    frame = pd.DataFrame({column: [None] for column in result_columns(class_names)})
+    frame['error'] = message
+    return frame
+
+
+class CsvResultWriter:
+    """Encode result DataFrames as one CSV document"""
+
+    def __init__(self, class_names):
+        self.class_names = class_names
+        self._header = True
+
+    def write(self, frame):
+        data = frame.to_csv(index=False, header=self._header).encode()
+        self._header = False
+        return data
+
+    def fail(self, message):
+        """Final row for a stream that broke off: no index, only the error"""
+        return self.write(error_frame(self.class_names, message))
+
+    def close(self):
+        return b''
+
+
+class ArrowResultWriter:
+    """Encode result DataFrames as record batches of one Arrow IPC stream"""
+
+    def __init__(self, class_names):
+        require_arrow()
+        self.class_names = class_names
+        self.schema = pa.schema(
+            [('index', pa.int64()), ('prediction', pa.string()), ('confidence', pa.float32())]
+            + [(f'prob_{name}', pa.float32()) for name in class_names]
+            + [('error', pa.string())]
+        )
+        self._sink = io.BytesIO()
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def _drain(self):
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
+
+    def write(self, frame):
+        self._writer.write_batch(
+            pa.RecordBatch.from_pandas(frame, schema=self.schema, preserve_index=False)
+        )
+        return self._drain()
+
+    def fail(self, message):
+        """Final batch for a stream that broke off (a null index and the error), then the end of stream"""
+        return self.write(error_frame(self.class_names, message)) + self.close()
+
+    def close(self):
+        self._writer.close()
+        return self._drain()
+
+
+class NpyResultWriter:
+    """Encode probability matrices as one float32 .npy array of known shape"""
+
+    def __init__(self, n_rows, n_classes):
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {
+            'descr': np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+            'fortran_order': False,
+            'shape': (n_rows, n_classes)
+        })
+        self._header = header.getvalue()
+        self.n_classes = n_classes
+        self._remaining = n_rows
+
+    def write(self, prediction_proba):
+        data = self._header + np.ascontiguousarray(prediction_proba, dtype=np.float32).tobytes()
+        self._header = b''
+        self._remaining -= len(prediction_proba)
+        return data
+
+    def fail(self, message):
+        """Fill the rows that were not scored with NaN, so the array keeps its declared shape"""
+        return self.write(np.full((self._remaining, self.n_classes), np.nan, dtype=np.float32))
+
+    def close(self):
+        return self._header
@@ -0,0 +1,84 @@
+"""
+Disease labelling rules for the training data
+
+assign_diseases labels a whole dataframe at once with boolean masks;
+assign_disease is the original row-by-row version, kept as the reference the
+vectorized rules are tested against.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DISEASE = 'Healthy'
+
+
+def assign_disease(row):
+    """Assign disease based on environmental and health factors"""
+    # Primary conditions for specific diseases
+    if row['Rainfall_mm'] > 100 and row['FeverCases'] > 25:
+        return 'Dengue'
+    elif row['Humidity_pct'] > 85 and row['ToiletUsage_pct'] < 75:
+        return 'Typhoid'
+    elif row['WaterIndex'] > 0.6 and row['NDVI'] < 0.4:
+        return 'Malaria'
+    elif row['FeverCases'] < 10 and row['Absenteeism_pct'] < 5:
+        return 'Healthy'
+
+    # Secondary conditions - more relaxed criteria
+    elif row['Rainfall_mm'] > 50 and row['FeverCases'] > 15:
+        return 'Dengue'
+    elif row['Humidity_pct'] > 70 and row['ToiletUsage_pct'] < 80:
+        return 'Typhoid'
+    elif row['WaterIndex'] > 0.4 and row['NDVI'] < 0.5:
+        return 'Malaria'
+    elif row['FeverCases'] < 15 and row['Absenteeism_pct'] < 10:
+        return 'Healthy'
+
+    # Tertiary conditions - even more relaxed
+    elif row['FeverCases'] > 20 or row['Rainfall_mm'] > 75:
+        return 'Dengue'
+    elif row['Humidity_pct'] > 80 or row['ToiletUsage_pct'] < 70:
+        return 'Typhoid'
+    elif row['WaterIndex'] > 0.5 or row['NDVI'] < 0.6:
+        return 'Malaria'
+    else:
+        return 'Healthy'  # Default to Healthy
+
+
+def assign_diseases(df):
+    """Vectorized assign_disease: label every row of a dataframe at once
+
+    np.select picks the first matching condition, which gives the rules the same
+    precedence as the if/elif chain. Missing values fail every comparison, as
+    they do row by row, so such rows fall through to the default.
+    """
+    rainfall = df['Rainfall_mm'].to_numpy()
+    fever = df['FeverCases'].to_numpy()
+    humidity = df['Humidity_pct'].to_numpy()
+    toilet = df['ToiletUsage_pct'].to_numpy()
+    water = df['WaterIndex'].to_numpy()
+    ndvi = df['NDVI'].to_numpy()
+    absenteeism = df['Absenteeism_pct'].to_numpy()
+
+    rules = [
+        # Primary conditions for specific diseases
+        ((rainfall > 100) & (fever > 25), 'Dengue'),
+        ((humidity > 85) & (toilet < 75), 'Typhoid'),
+        ((water > 0.6) & (ndvi < 0.4), 'Malaria'),
+        ((fever < 10) & (absenteeism < 5), 'Healthy'),
+        # Secondary conditions - more relaxed criteria
+        ((rainfall > 50) & (fever > 15), 'Dengue'),
+        ((humidity > 70) & (toilet < 80), 'Typhoid'),
+        ((water > 0.4) & (ndvi < 0.5), 'Malaria'),
+        ((fever < 15) & (absenteeism < 10), 'Healthy'),
+        # Tertiary conditions - even more relaxed
+        ((fever > 20) | (rainfall > 75), 'Dengue'),
+        ((humidity > 80) | (toilet < 70), 'Typhoid'),
+        ((water > 0.5) | (ndvi < 0.6), 'Malaria'),
+    ]
+    labels = np.select(
+        [condition for condition, _ in rules],
+        [label for _, label in rules],
+        default=DEFAULT_DISEASE
+    )
+    return pd.Series(labels, index=df.index, dtype=object)
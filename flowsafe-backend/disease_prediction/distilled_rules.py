@@ -0,0 +1,92 @@
+"""
+Pure-Python evaluator for distilled disease rules
+
+regenerate_model_v2.py --distill fits a shallow decision tree to the XGBoost
+model's probabilities and exports it, with the category code maps, as JSON.
+This module only needs the standard library, so it can be copied to gateways
+(or ported to the mobile app) to score records offline without the service.
+
+Rules format (format_version 1):
+    feature_columns      model input columns, as in the service
+    categorical_classes  training categories per categorical column; a value's
+                         code is its position in the list
+    classes              disease names, in probability order
+    tree                 nested nodes; a split is
+                           {"feature", "threshold", "missing", "left", "right"}
+                         and goes left when value <= threshold, or to the
+                         "missing" branch for missing values and unseen
+                         categories; a leaf is {"probabilities": [...]}
+"""
+
+import json
+
+RULES_FORMAT_VERSION = 1
+DISTILLED_RULES_PATH = 'disease_rules.json'
+
+
+class DistilledRules:
+    """Score records with an exported rules tree"""
+
+    def __init__(self, rules):
+        if rules.get('format_version') != RULES_FORMAT_VERSION:
+            raise ValueError(f"Unsupported rules format: {rules.get('format_version')!r}")
+
+        self.feature_columns = rules['feature_columns']
+        self.classes = rules['classes']
+        self.codes = {
+            col: {value: code for code, value in enumerate(values)}
+            for col, values in rules['categorical_classes'].items()
+        }
+        self.tree = rules['tree']
+        self.teacher_model_version = rules.get('teacher_model_version')
+
+    @classmethod
+    def load(cls, path=DISTILLED_RULES_PATH):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def _value(self, record, feature):
+        """Numeric value of a feature, or None if missing, invalid or an unseen category"""
+        value = record.get(feature)
+        if value is None:
+            return None
+        codes = self.codes.get(feature)
+        if codes is not None:
+            return codes.get(str(value))
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+        return None if value != value else value
+
+    def predict_proba(self, record):
+        """Class probabilities for one record, in self.classes order"""
+        node = self.tree
+        while 'probabilities' not in node:
+            value = self._value(record, node['feature'])
+            if value is None:
+                node = node[node['missing']]
+            elif value <= node['threshold']:
+                node = node['left']
+            else:
+                node = node['right']
+        return node['probabilities']
+
+    def predict(self, record):
+        """Prediction payload for one record, shaped like the service's /predict response"""
+        probabilities = self.predict_proba(record)
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return {
+            "prediction": self.classes[best],
+            "confidence": probabilities[best],
+            "probabilities": dict(zip(self.classes, probabilities))
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    rules = DistilledRules.load(sys.argv[1] if len(sys.argv) > 1 else DISTILLED_RULES_PATH)
+    for line in sys.stdin:
+        if line.strip():
+            print(json.dumps(rules.predict(json.loads(line))))
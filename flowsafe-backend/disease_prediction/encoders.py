@@ -0,0 +1,98 @@
+"""
+Dictionary-based categorical encoders for the disease prediction service
+"""
+
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# How values that were not seen during training are encoded:
+#   first   - use the first category code (0), the service's historical behaviour
+#   missing - encode as NaN so XGBoost follows each split's default branch
+#   error   - reject the record
+UNSEEN_POLICIES = ('first', 'missing', 'error')
+
+# Distinct unseen values that single-record encoding warns about, per encoder
+MAX_WARNED_VALUES = 1000
+
+
+class UnseenCategoryError(ValueError):
+    """Raised for unseen categories when the policy is 'error'"""
+
+
+class CategoryEncoder:
+    """Map category values to training codes with a precomputed hash map"""
+
+    def __init__(self, name, classes, unseen_policy='first'):
+        if unseen_policy not in UNSEEN_POLICIES:
+            raise ValueError(f"Unknown unseen category policy: {unseen_policy}")
+
+        self.name = name
+        self.classes_ = np.array(classes)
+        self.codes = {value: code for code, value in enumerate(classes)}
+        self.unseen_policy = unseen_policy
+        self.unseen_code = np.nan if unseen_policy == 'missing' else 0.0
+        self._warned = set()
+
+    def _lookup(self, value):
+        try:
+            return self.codes.get(value)
+        except TypeError:
+            # Unhashable values (lists, dicts) can never be known categories
+            return None
+
+    def known(self, value):
+        """Return True if the value is a training category"""
+        return self._lookup(value) is not None
+
+    def unseen_mask(self, values):
+        """Boolean array marking values that are not known categories"""
+        lookup = self._lookup
+        return np.fromiter((lookup(value) is None for value in values), dtype=bool, count=len(values))
+
+    def encode(self, value):
+        """Encode a single value"""
+        code = self._lookup(value)
+        if code is not None:
+            return float(code)
+
+        if self.unseen_policy == 'error':
+            raise UnseenCategoryError(f"Unseen category in {self.name}: {value!r}")
+        self._warn_unseen(value)
+        return self.unseen_code
+
+    def _warn_unseen(self, value):
+        """Log each distinct unseen value once, up to MAX_WARNED_VALUES of them"""
+        key = repr(value)[:100]
+        if key in self._warned or len(self._warned) >= MAX_WARNED_VALUES:
+            return
+        self._warned.add(key)
+        logger.warning(f"Unseen category in {self.name}: {key}, using {self.unseen_policy} policy "
+                       f"(logged once per value)")
+
+    def encode_many(self, values):
+        """Encode a sequence of values into a float array"""
+        lookup = self._lookup
+        codes = np.fromiter(
+            (code if code is not None else -1 for code in map(lookup, values)),
+            dtype=np.float64,
+            count=len(values)
+        )
+
+        unseen = codes < 0
+        if unseen.any():
+            if self.unseen_policy == 'error':
+                raise UnseenCategoryError(f"{int(unseen.sum())} unseen categories in {self.name}")
+            logger.warning(f"{int(unseen.sum())} unseen categories in {self.name}, "
+                           f"using {self.unseen_policy} policy")
+            codes[unseen] = self.unseen_code
+        return codes
+
+
+def build_category_encoders(categorical_classes, unseen_policy='first'):
+    """Build one encoder per categorical column from the bundle's class lists"""
+    return {
+        col: CategoryEncoder(col, classes, unseen_policy)
+        for col, classes in categorical_classes.items()
+    }
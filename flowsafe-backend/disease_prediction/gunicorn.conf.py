@@ -0,0 +1,59 @@
+"""
+Gunicorn configuration for the disease prediction service
+
+The app is preloaded in the master process, so the model and encoders are
+loaded once and shared copy-on-write by the forked workers.
+"""
+
+import gc
+import multiprocessing
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+
+cpu_count = multiprocessing.cpu_count()
+workers = int(os.getenv('WEB_CONCURRENCY', cpu_count))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+# The sync worker closes every connection; gthread honours keep-alive even with
+# one thread, so the Django proxy's pooled connections are reused
+worker_class = 'gthread'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+keepalive = 5
+
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+loglevel = 'info' if os.getenv('DEBUG', 'False').lower() == 'true' else 'warning'
+
+# Split the cores between concurrent requests so booster threads do not oversubscribe
+# the CPU. Must be set before the app is preloaded, which reads XGB_NTHREAD.
+if not int(os.getenv('XGB_NTHREAD', '0')):
+    os.environ['XGB_NTHREAD'] = str(max(1, cpu_count // (workers * threads)))
+
+# Workers write their metrics to files here, and /metrics merges them (see metrics.py).
+# Must be set before the app is preloaded, since prometheus_client reads it at import.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prediction_metrics')
+
+
+def on_starting(server):
+    # Values left by a previous run would be merged into this one's
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    import metrics
+    metrics.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    # Move the preloaded model out of the collector's reach so garbage collection
+    # in the workers does not touch (and copy) the shared pages
+    gc.freeze()
+    server.log.info(
+        f"Serving with {workers} workers x {threads} threads, "
+        f"XGB_NTHREAD={os.environ['XGB_NTHREAD']}"
+    )
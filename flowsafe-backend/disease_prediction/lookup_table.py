@@ -0,0 +1,121 @@
+"""
+Quantized lookup table of class probabilities keyed on the model's own split bins
+
+Every tree split compares one feature with a threshold, so two rows whose values
+fall between the same pair of consecutive thresholds, feature by feature, take
+the same path through every tree and get exactly the same probabilities. Rows
+are binned to those thresholds and looked up by bin tuple; cells that are not in
+the table yet are scored with the full model once and then served from it.
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+
+from prediction_cache import PredictionCache
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_TABLE_PATH = 'disease_lookup_table.npz'
+
+
+def split_thresholds(booster):
+    """Sorted distinct split thresholds of every feature of a booster"""
+    model = json.loads(bytes(booster.save_raw(raw_format='json')))
+    thresholds = [set() for _ in range(booster.num_features())]
+    for tree in model['learner']['gradient_booster']['model']['trees']:
+        if tree['categories_nodes']:
+            raise ValueError("Lookup tables do not support categorical splits")
+        for left, feature, condition in zip(tree['left_children'], tree['split_indices'],
+                                            tree['split_conditions']):
+            if left != -1:
+                thresholds[feature].add(condition)
+    return [np.array(sorted(values), dtype=np.float32) for values in thresholds]
+
+
+def bin_dtype(thresholds):
+    """Smallest integer type holding every bin index"""
+    return np.uint8 if max(len(t) for t in thresholds) < 255 else np.uint16
+
+
+def bin_features(thresholds, features):
+    """Bin of every value (the number of thresholds at or below it) and a mask of rows with missing values"""
+    features = np.asarray(features, dtype=np.float32)
+    bins = np.empty(features.shape, dtype=bin_dtype(thresholds))
+    for f, feature_thresholds in enumerate(thresholds):
+        # side='right' puts a value equal to a threshold on its right, matching x < threshold going left
+        bins[:, f] = np.searchsorted(feature_thresholds, features[:, f], side='right')
+    return bins, np.isnan(features).any(axis=1)
+
+
+class LookupTable:
+    """Bounded table of class probabilities per bin tuple, filled from the full model on misses"""
+
+    def __init__(self, thresholds, maxsize):
+        self.thresholds = thresholds
+        self.cells = PredictionCache(maxsize, ttl=float('inf'))
+        self.fallbacks = 0
+        self.seeded = 0
+
+    @classmethod
+    def from_booster(cls, booster, maxsize):
+        return cls(split_thresholds(booster), maxsize)
+
+    def seed(self, bins, prediction_proba):
+        """Preload cells computed ahead of time, e.g. by regenerate_model_v2.py --lookup-table"""
+        if bins.shape[1] != len(self.thresholds):
+            raise ValueError("Lookup table seed does not match the model's features")
+        bins = bins[:self.cells.maxsize]
+        self.cells.put_many(
+            (row.astype(bin_dtype(self.thresholds)).tobytes(), proba)
+            for row, proba in zip(bins, prediction_proba.astype(np.float32))
+        )
+        self.seeded = len(bins)
+
+    def load_seed(self, path, model_sha256):
+        """Seed from a file written for this model; any other file is ignored"""
+        if not os.path.exists(path):
+            return
+        with np.load(path) as seed:
+            if str(seed['model_sha256']) != model_sha256:
+                logger.warning(f"{path} was not generated for the current model, not seeding the lookup table")
+                return
+            self.seed(seed['bins'], seed['probabilities'])
+        logger.info(f"Lookup table seeded with {self.seeded} cells from {path}")
+
+    def predict(self, features, predict_matrix):
+        """Class probabilities from the table, scoring missing cells with predict_matrix"""
+        bins, missing = bin_features(self.thresholds, features)
+        keys = [row.tobytes() for row in bins]
+        # Rows with missing values follow default branches, which bins cannot express
+        in_table = ~missing
+        cached = self.cells.get_many([key for key, ok in zip(keys, in_table) if ok])
+        values = iter(cached)
+        cached = [next(values) if ok else None for ok in in_table]
+
+        misses = [i for i, value in enumerate(cached) if value is None]
+        if not misses:
+            return np.vstack(cached)
+
+        scored = predict_matrix(features[misses])
+        prediction_proba = np.empty((len(features), scored.shape[1]), dtype=scored.dtype)
+        for i, value in enumerate(cached):
+            if value is not None:
+                prediction_proba[i] = value
+        prediction_proba[misses] = scored
+
+        self.fallbacks += int(missing.sum())
+        self.cells.put_many(
+            (keys[i], scored[j].copy()) for j, i in enumerate(misses) if in_table[i]
+        )
+        return prediction_proba
+
+    def stats(self):
+        stats = self.cells.stats()
+        del stats["ttl_seconds"]
+        stats["seeded"] = self.seeded
+        stats["missing_value_fallbacks"] = self.fallbacks
+        stats["bins_per_feature"] = [len(t) + 1 for t in self.thresholds]
+        return stats
@@ -0,0 +1,95 @@
+"""
+Counters and histograms exposed in the Prometheus text format
+
+Built on prometheus_client. When PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py
+sets it), every worker writes its values to its own files in that directory and
+/metrics merges the files of all workers, including ones that have exited, so
+counters stay monotonic whichever worker answers the scrape. Without it, as
+under the development server, values are kept in the process.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+import prometheus_client
+from prometheus_client import CollectorRegistry, multiprocess
+
+CONTENT_TYPE = prometheus_client.CONTENT_TYPE_LATEST
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+# Seconds, from tens of microseconds (single-row stages) up to large bulk chunks
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+registry = CollectorRegistry()
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self._metric = prometheus_client.Counter(name, documentation, labelnames, registry=registry)
+
+    def inc(self, amount=1, **labels):
+        (self._metric.labels(**labels) if labels else self._metric).inc(amount)
+
+
+class Histogram:
+    """Bucket histogram with a running sum and count, optionally split by labels"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self._metric = prometheus_client.Histogram(
+            name, documentation, labelnames, buckets=buckets, registry=registry
+        )
+
+    def observe(self, value, **labels):
+        (self._metric.labels(**labels) if labels else self._metric).observe(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of a block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+def render():
+    """Render every metric in the Prometheus text exposition format, across all workers"""
+    if MULTIPROC_DIR:
+        merged = CollectorRegistry()
+        multiprocess.MultiProcessCollector(merged, path=MULTIPROC_DIR)
+        return prometheus_client.generate_latest(merged)
+    return prometheus_client.generate_latest(registry)
+
+
+def mark_process_dead(pid):
+    """Forget the live-only values of an exited worker (its counters and histograms are kept)"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
+
+
+STAGE_SECONDS = Histogram(
+    'prediction_stage_seconds',
+    'Time spent in each stage of handling a prediction request',
+    labelnames=('stage',)
+)
+REQUEST_SECONDS = Histogram(
+    'prediction_request_seconds',
+    'Time to produce a response, by endpoint',
+    labelnames=('endpoint',)
+)
+BATCH_SIZE = Histogram(
+    'prediction_batch_size',
+    'Records per batch request or micro-batch',
+    labelnames=('source',),
+    buckets=SIZE_BUCKETS
+)
+UNSEEN_CATEGORIES = Counter(
+    'prediction_unseen_categories_total',
+    'Categorical values that were not seen during training',
+    labelnames=('column',)
+)
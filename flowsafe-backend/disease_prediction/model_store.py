@@ -0,0 +1,274 @@
+"""
+Loading, versioning and hot reloading of the disease prediction model
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder
+
+from encoders import build_category_encoders
+from lookup_table import LookupTable
+from tree_compiler import compile_booster
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_BUNDLE_VERSIONS = {1}
+
+
+def load_encoder_bundle(bundle_path, feature_columns):
+    """Read the encoder/metadata bundle written by regenerate_model_v2.py"""
+    if not os.path.exists(bundle_path):
+        raise FileNotFoundError(
+            f"Encoder bundle {bundle_path} not found, run 'python regenerate_model_v2.py --bundle-only'"
+        )
+
+    with open(bundle_path) as f:
+        bundle = json.load(f)
+
+    if bundle.get('bundle_version') not in SUPPORTED_BUNDLE_VERSIONS:
+        raise ValueError(f"Unsupported encoder bundle version: {bundle.get('bundle_version')}")
+    if bundle.get('feature_columns') != feature_columns:
+        raise ValueError("Encoder bundle feature columns do not match the service")
+
+    return bundle
+
+
+def encoder_from_classes(classes):
+    """Rebuild a fitted LabelEncoder from its stored classes"""
+    le = LabelEncoder()
+    le.classes_ = np.array(classes)
+    return le
+
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_signature(path):
+    """Cheap change marker for a file, None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ModelState:
+    """Everything needed to serve one model version, swapped as a single reference"""
+
+    def __init__(self, booster, model, model_format, model_path, label_encoders, le_disease,
+                 model_version, signatures, compiled_model=None, lookup_table=None):
+        # booster and model are None when compiled_model serves the predictions
+        self.booster = booster
+        self.model = model
+        self.compiled_model = compiled_model
+        self.lookup_table = lookup_table
+        self.inference_backend = 'compiled' if compiled_model is not None else 'xgboost'
+        self.model_format = model_format
+        self.model_path = model_path
+        self.label_encoders = label_encoders
+        self.le_disease = le_disease
+        self.model_version = model_version
+        self.signatures = signatures
+        self.available_locations = label_encoders['Location'].classes_.tolist()
+        self.available_weeks = label_encoders['Week'].classes_.tolist()
+        self.loaded_at = datetime.now().isoformat()
+
+
+class ModelLoader:
+    """Build ModelState objects from the model files on disk"""
+
+    def __init__(self, model_path, booster_path, bundle_path, model_format,
+                 feature_columns, categorical_columns, unseen_policy, nthread=0,
+                 inference_backend='xgboost', lookup_table_size=0, lookup_table_path=None,
+                 verify_model=True):
+        self.model_path = model_path
+        self.booster_path = booster_path
+        self.bundle_path = bundle_path
+        self.model_format = model_format
+        self.feature_columns = feature_columns
+        self.categorical_columns = categorical_columns
+        self.unseen_policy = unseen_policy
+        self.nthread = nthread
+        self.inference_backend = inference_backend
+        self.lookup_table_size = lookup_table_size
+        self.lookup_table_path = lookup_table_path
+        # False when the bundle is only borrowed for its encoders, as by a shadow model
+        self.verify_model = verify_model
+
+    def signatures(self):
+        """Change markers of every file a ModelState is built from"""
+        return {
+            path: file_signature(path)
+            for path in (self.model_path, self.booster_path, self.bundle_path)
+        }
+
+    def pickle_matches(self, bundle):
+        """True if the pickled model exists and is the file the bundle was generated for"""
+        return os.path.exists(self.model_path) and file_sha256(self.model_path) == bundle['model_sha256']
+
+    def booster_matches(self, bundle):
+        """True if the booster file exists and is the one the bundle names"""
+        if not os.path.exists(self.booster_path):
+            return False
+        return file_sha256(self.booster_path) in (bundle.get('booster_sha256'), bundle['model_sha256'])
+
+    def load(self, strict=False):
+        """Load the model and its encoder bundle
+
+        With strict=True a bundle that was generated for a different model file is
+        an error instead of a warning, so a half-written update is never served.
+        A pickle the bundle does not describe is never served: the booster the
+        bundle names is loaded instead, or loading fails. With strict=True an
+        existing pickle the bundle does not describe is an error too, since it
+        means the pickle was written without its bundle.
+        """
+        signatures = self.signatures()
+        bundle = load_encoder_bundle(self.bundle_path, self.feature_columns)
+
+        use_booster = self.model_format == 'booster' and os.path.exists(self.booster_path)
+        if not use_booster and self.verify_model and not self.pickle_matches(bundle):
+            # A booster-only export leaves no pickle, or an older one it does not describe
+            if not self.booster_matches(bundle):
+                raise ValueError(f"{self.bundle_path} was not generated for {self.model_path} "
+                                 f"and no matching {self.booster_path} exists")
+            if strict and os.path.exists(self.model_path):
+                raise ValueError(f"{self.model_path} changed but {self.bundle_path} was not regenerated for it")
+            logger.warning(f"{self.model_path} is missing or stale, loading {self.booster_path} instead")
+            use_booster = True
+
+        # Prefer the native booster over the pickled sklearn wrapper
+        if use_booster:
+            model = None
+            booster = xgb.Booster()
+            booster.load_model(self.booster_path)
+            model_format, model_path = 'booster', self.booster_path
+            expected_sha256 = bundle.get('booster_sha256')
+        else:
+            if self.model_format == 'booster':
+                logger.warning(f"Booster file {self.booster_path} not found, falling back to {self.model_path}")
+            if not os.path.exists(self.model_path):
+                raise FileNotFoundError(f"Model file {self.model_path} not found")
+            model = joblib.load(self.model_path)
+            booster = model.get_booster()
+            model_format, model_path = 'sklearn', self.model_path
+            expected_sha256 = bundle['model_sha256']
+
+        if expected_sha256 is not None and file_sha256(model_path) != expected_sha256:
+            message = f"{self.bundle_path} was not generated for the current {model_path}"
+            if strict:
+                raise ValueError(message)
+            logger.warning(message)
+
+        if self.nthread > 0:
+            booster.set_param({'nthread': self.nthread})
+
+        compiled_model = None
+        if self.inference_backend == 'compiled':
+            try:
+                compiled_model = compile_booster(booster)
+            except Exception as e:
+                logger.warning(f"Compiled inference disabled, scoring with XGBoost: {str(e)}")
+
+        lookup_table = None
+        if self.lookup_table_size > 0:
+            try:
+                lookup_table = LookupTable.from_booster(booster, self.lookup_table_size)
+                if self.lookup_table_path:
+                    lookup_table.load_seed(self.lookup_table_path, bundle['model_sha256'])
+            except Exception as e:
+                logger.warning(f"Lookup table disabled: {str(e)}")
+                lookup_table = None
+
+        if compiled_model is not None:
+            # The compiled arrays replace XGBoost for scoring, so the booster is not kept
+            booster = model = None
+
+        label_encoders = build_category_encoders(
+            {col: bundle['categorical_classes'][col] for col in self.categorical_columns},
+            self.unseen_policy
+        )
+        return ModelState(
+            booster=booster,
+            model=model,
+            model_format=model_format,
+            model_path=model_path,
+            label_encoders=label_encoders,
+            le_disease=encoder_from_classes(bundle['disease_classes']),
+            model_version=bundle['model_sha256'][:12],
+            signatures=signatures,
+            compiled_model=compiled_model,
+            lookup_table=lookup_table
+        )
+
+
+class ModelWatcher:
+    """Background thread that reloads the model when its files change and swaps it in"""
+
+    def __init__(self, loader, get_state, swap, interval):
+        self.loader = loader
+        self.get_state = get_state
+        self.swap = swap
+        self.interval = interval
+        self.pid = os.getpid()
+        self._pending = None
+        self._failed = None
+
+    def start(self):
+        thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        thread.start()
+
+    def check(self):
+        """Reload once the files have changed and then stayed unchanged for one interval"""
+        signatures = self.loader.signatures()
+        if signatures == self.get_state().signatures or signatures == self._failed:
+            return False
+
+        if signatures != self._pending:
+            # Files are still being written, look again on the next tick
+            self._pending = signatures
+            return False
+        self._pending = None
+
+        try:
+            state = self.loader.load(strict=True)
+        except Exception as e:
+            logger.error(f"Model reload failed, keeping the current model: {str(e)}")
+            self._failed = signatures
+            return False
+
+        current = self.get_state()
+        if (state.model_version == current.model_version and state.model_path == current.model_path
+                and state.signatures[state.model_path] == current.signatures[current.model_path]):
+            # Some file changed, but not the model the bundle describes, so nothing new would be served
+            changed = [path for path, signature in signatures.items() if signature != current.signatures.get(path)]
+            logger.error(f"Model reload skipped: {', '.join(changed)} changed but the served model "
+                         f"{current.model_path} ({current.model_version}) did not; "
+                         f"regenerate the model together with its encoder bundle")
+            self._failed = signatures
+            return False
+
+        self.swap(state)
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Model watcher error: {str(e)}")
@@ -5,44 +5,13 @@ Script to regenerate the ML model with compatible NumPy version
 
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 import xgboost as xgb
 import joblib
 import os
-
-def assign_disease(row):
-    """Assign disease based on environmental and health factors"""
-    # Primary conditions for specific diseases
-    if row['Rainfall_mm'] > 100 and row['FeverCases'] > 25:
-        return 'Dengue'
-    elif row['Humidity_pct'] > 85 and row['ToiletUsage_pct'] < 75:
-        return 'Typhoid'
-    elif row['WaterIndex'] > 0.6 and row['NDVI'] < 0.4:
-        return 'Malaria'
-    elif row['FeverCases'] < 10 and row['Absenteeism_pct'] < 5:
-        return 'Healthy'
-    
-    # Secondary conditions - more relaxed criteria
-    elif row['Rainfall_mm'] > 50 and row['FeverCases'] > 15:
-        return 'Dengue'
-    elif row['Humidity_pct'] > 70 and row['ToiletUsage_pct'] < 80:
-        return 'Typhoid'
-    elif row['WaterIndex'] > 0.4 and row['NDVI'] < 0.5:
-        return 'Malaria'
-    elif row['FeverCases'] < 15 and row['Absenteeism_pct'] < 10:
-        return 'Healthy'
-    
-    # Tertiary conditions - even more relaxed
-    elif row['FeverCases'] > 20 or row['Rainfall_mm'] > 75:
-        return 'Dengue'
-    elif row['Humidity_pct'] > 80 or row['ToiletUsage_pct'] < 70:
-        return 'Typhoid'
-    elif row['WaterIndex'] > 0.5 or row['NDVI'] < 0.6:
-        return 'Malaria'
-    else:
-        return 'Healthy'  # Default to Healthy
+from disease_labels import assign_diseases
+from regenerate_model_v2 import MODEL_PATH, fit_encoders, save_model_files
 
 def regenerate_model():
     """Regenerate the ML model with current NumPy version"""
@@ -60,7 +29,7 @@ def regenerate_model():
     
     # Assign diseases
     print("Assigning disease labels...")
-    df['Disease'] = df.apply(assign_disease, axis=1)
+    df['Disease'] = assign_diseases(df)
     
     # Print disease distribution
     print("\nDisease distribution:")
@@ -73,16 +42,11 @@ def regenerate_model():
     X = df[feature_columns].copy()
     y = df['Disease']
     
-    # Encode categorical features
-    label_encoders = {}
+    # Encode categorical features and target the way the prediction service does
+    label_encoders, le_disease = fit_encoders(df)
     for col in ['Week', 'Location']:
-        le = LabelEncoder()
-        X[col] = le.fit_transform(X[col])
-        label_encoders[col] = le
-    
-    # Encode target
-    le_disease = LabelEncoder()
-    y_encoded = le_disease.fit_transform(y)
+        X[col] = label_encoders[col].transform(X[col])
+    y_encoded = le_disease.transform(y)
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
@@ -108,10 +72,9 @@ def regenerate_model():
     print(f"Train accuracy: {train_accuracy:.4f}")
     print(f"Test accuracy: {test_accuracy:.4f}")
     
-    # Save model
-    model_path = "xgb_disease_prediction_model.pkl"
-    print(f"Saving model to {model_path}...")
-    joblib.dump(model, model_path)
+    # Save the model, its native booster and the encoder bundle the prediction service loads
+    model_path = MODEL_PATH
+    save_model_files(model, label_encoders, le_disease, model_path)
     
     # Test loading
     print("Testing model loading...")
@@ -8,45 +8,633 @@ import numpy as np
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeRegressor
 import xgboost as xgb
 import joblib
 import os
+import json
+import hashlib
+import argparse
+import itertools
+import multiprocessing
+import tempfile
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from disease_labels import assign_diseases
 
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
-def assign_disease(row):
-    """Assign disease based on environmental and health factors"""
-    # Primary conditions for specific diseases
-    if row['Rainfall_mm'] > 100 and row['FeverCases'] > 25:
-        return 'Dengue'
-    elif row['Humidity_pct'] > 85 and row['ToiletUsage_pct'] < 75:
-        return 'Typhoid'
-    elif row['WaterIndex'] > 0.6 and row['NDVI'] < 0.4:
-        return 'Malaria'
-    elif row['FeverCases'] < 10 and row['Absenteeism_pct'] < 5:
-        return 'Healthy'
-    
-    # Secondary conditions - more relaxed criteria
-    elif row['Rainfall_mm'] > 50 and row['FeverCases'] > 15:
-        return 'Dengue'
-    elif row['Humidity_pct'] > 70 and row['ToiletUsage_pct'] < 80:
-        return 'Typhoid'
-    elif row['WaterIndex'] > 0.4 and row['NDVI'] < 0.5:
-        return 'Malaria'
-    elif row['FeverCases'] < 15 and row['Absenteeism_pct'] < 10:
-        return 'Healthy'
-    
-    # Tertiary conditions - even more relaxed
-    elif row['FeverCases'] > 20 or row['Rainfall_mm'] > 75:
-        return 'Dengue'
-    elif row['Humidity_pct'] > 80 or row['ToiletUsage_pct'] < 70:
-        return 'Typhoid'
-    elif row['WaterIndex'] > 0.5 or row['NDVI'] < 0.6:
-        return 'Malaria'
+DATA_PATH = 'delhi_disease_data_10000.csv'
+MODEL_PATH = 'xgb_disease_prediction_model.pkl'
+BOOSTER_PATH = 'xgb_disease_prediction_model.ubj'
+ENCODER_BUNDLE_PATH = 'disease_encoders.json'
+ENCODER_BUNDLE_VERSION = 1
+LOOKUP_TABLE_PATH = 'disease_lookup_table.npz'
+
+FEATURE_COLUMNS = ['Week', 'Location', 'NDVI', 'WaterIndex', 'Rainfall_mm',
+                   'Humidity_pct', 'FeverCases', 'Absenteeism_pct', 'ToiletUsage_pct']
+CATEGORICAL_COLUMNS = ['Week', 'Location']
+
+# Chunked training: rows read per chunk, and the held-out share of every chunk
+CHUNK_ROWS = 100000
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+# Hyperparameter search: candidate grid, boosting rounds and the report it writes
+SEARCH_SPACE = {
+    'max_depth': [3, 4, 6, 8],
+    'learning_rate': [0.05, 0.1, 0.3],
+}
+SEARCH_MAX_ROUNDS = 300
+SEARCH_EARLY_STOPPING_ROUNDS = 10
+SEARCH_LATENCY_ROWS = 1000
+# Time allowed after the budget for running candidates to stop and report
+SEARCH_GRACE_SECONDS = 30
+SEARCH_REPORT_PATH = 'model_search_report.json'
+
+# Distillation: depth of the student tree and extra rows labelled by the teacher
+DISTILL_DEPTH = 8
+DISTILL_MIN_SAMPLES_LEAF = 20
+DISTILL_SYNTHETIC_ROWS = 50000
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def build_encoder_bundle(label_encoders, le_disease, model_path=MODEL_PATH, booster_path=BOOSTER_PATH):
+    """Collect everything the prediction service needs besides the model itself"""
+    bundle = {
+        "bundle_version": ENCODER_BUNDLE_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "model_file": os.path.basename(model_path),
+        "model_sha256": file_sha256(model_path),
+        "feature_columns": FEATURE_COLUMNS,
+        "categorical_classes": {
+            col: label_encoders[col].classes_.tolist() for col in CATEGORICAL_COLUMNS
+        },
+        "disease_classes": le_disease.classes_.tolist()
+    }
+    if os.path.exists(booster_path):
+        bundle["booster_file"] = os.path.basename(booster_path)
+        bundle["booster_sha256"] = file_sha256(booster_path)
+    return bundle
+
+def temporary_path(path):
+    """Sibling path to write to before an atomic rename, keeping the file extension"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.tmp{ext}"
+
+def save_booster(booster, booster_path=BOOSTER_PATH):
+    """Atomically save a native XGBoost Booster"""
+    tmp_path = temporary_path(booster_path)
+    booster.save_model(tmp_path)
+    os.replace(tmp_path, booster_path)
+    print(f"✓ Native booster saved to {booster_path}")
+
+def export_booster(model, booster_path=BOOSTER_PATH):
+    """Save the raw XGBoost Booster so the service can load it without the sklearn wrapper"""
+    save_booster(model.get_booster(), booster_path)
+
+def remove_stale_pickle(model_path=MODEL_PATH):
+    """Delete the pickled model of an earlier run, which a booster-only export leaves behind"""
+    if os.path.exists(model_path):
+        os.remove(model_path)
+        print(f"✓ Removed {model_path}, which no longer matches the booster")
+
+def save_model_files(model, label_encoders, le_disease, model_path=MODEL_PATH):
+    """Atomically save the pickled model, its native booster and then the encoder bundle"""
+    print(f"Saving model to {model_path}...")
+    joblib.dump(model, temporary_path(model_path))
+    os.replace(temporary_path(model_path), model_path)
+    export_booster(model)
+    save_encoder_bundle(build_encoder_bundle(label_encoders, le_disease, model_path))
+
+def save_encoder_bundle(bundle, bundle_path=ENCODER_BUNDLE_PATH):
+    """Write the encoder/metadata bundle next to the model file
+
+    Written last and atomically, so a running service that hot reloads never
+    sees a bundle that does not match the model files.
+    """
+    tmp_path = temporary_path(bundle_path)
+    with open(tmp_path, 'w') as f:
+        json.dump(bundle, f, indent=2)
+    os.replace(tmp_path, bundle_path)
+    print(f"✓ Encoder bundle v{bundle['bundle_version']} saved to {bundle_path}")
+
+def save_lookup_table(booster, X, model_sha256, table_path=LOOKUP_TABLE_PATH):
+    """Precompute lookup table cells (see lookup_table.py) for every distinct cell of X"""
+    from lookup_table import split_thresholds, bin_features
+    
+    features = X[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+    bins, missing = bin_features(split_thresholds(booster), features)
+    bins, first = np.unique(bins[~missing], axis=0, return_index=True)
+    probabilities = booster.inplace_predict(features[~missing][first], validate_features=False)
+    
+    tmp_path = temporary_path(table_path)
+    np.savez_compressed(tmp_path, model_sha256=np.array(model_sha256), bins=bins,
+                        probabilities=probabilities.astype(np.float32))
+    os.replace(tmp_path, table_path)
+    print(f"✓ Lookup table with {len(bins)} cells saved to {table_path}")
+
+def load_existing_model():
+    """The existing model's booster and encoder bundle, or None if either is missing"""
+    if (not all(os.path.exists(path) for path in (DATA_PATH, ENCODER_BUNDLE_PATH))
+            or not any(os.path.exists(path) for path in (BOOSTER_PATH, MODEL_PATH))):
+        print(f"Error: '{DATA_PATH}', '{ENCODER_BUNDLE_PATH}' and '{BOOSTER_PATH}' or '{MODEL_PATH}' are required!")
+        return None
+    
+    with open(ENCODER_BUNDLE_PATH) as f:
+        bundle = json.load(f)
+    if os.path.exists(BOOSTER_PATH):
+        booster = xgb.Booster()
+        booster.load_model(BOOSTER_PATH)
     else:
-        return 'Healthy'  # Default to Healthy
+        booster = joblib.load(MODEL_PATH).get_booster()
+    return booster, bundle
+
+def encode_with_bundle(df, bundle):
+    """Encode the feature columns with the bundle's codes, exactly as the service does"""
+    X = df[FEATURE_COLUMNS].copy()
+    for col in CATEGORICAL_COLUMNS:
+        codes = {value: code for code, value in enumerate(bundle['categorical_classes'][col])}
+        X[col] = X[col].astype(str).map(codes)
+    return X
+
+def export_lookup_table():
+    """Seed the service's lookup table from the training data for the existing model"""
+    existing = load_existing_model()
+    if existing is None:
+        return False
+    booster, bundle = existing
+    
+    X = encode_with_bundle(pd.read_csv(DATA_PATH), bundle)
+    save_lookup_table(booster, X, bundle['model_sha256'])
+    return True
+
+def synthetic_rows(X, n_rows, seed=RANDOM_STATE):
+    """Rows drawn from each column's values independently, covering combinations the data lacks"""
+    rng = np.random.default_rng(seed)
+    return np.stack([rng.choice(X[:, f], size=n_rows) for f in range(X.shape[1])], axis=1)
+
+def tree_to_rules(tree, node=0):
+    """Nested rules for a fitted multi-output regression tree (format in distilled_rules.py)"""
+    left, right = tree.children_left[node], tree.children_right[node]
+    if left == -1:
+        values = tree.value[node][:, 0]
+        return {"probabilities": [round(float(v), 4) for v in values / values.sum()]}
+    return {
+        "feature": FEATURE_COLUMNS[tree.feature[node]],
+        "threshold": float(tree.threshold[node]),
+        # Missing values and unseen categories follow the branch most training rows took
+        "missing": "left" if tree.n_node_samples[left] >= tree.n_node_samples[right] else "right",
+        "left": tree_to_rules(tree, left),
+        "right": tree_to_rules(tree, right)
+    }
+
+def distill_model(depth=DISTILL_DEPTH):
+    """Fit a shallow tree to the existing model's probabilities and export it as JSON rules
+
+    The student learns the teacher's class probabilities on the training rows plus
+    synthetic rows, so it mimics the model rather than the training labels. Fidelity
+    is measured with the exported rules themselves on the held-out rows.
+    """
+    from distilled_rules import DISTILLED_RULES_PATH, RULES_FORMAT_VERSION, DistilledRules
+    
+    print(f"Distilling the existing model into a depth {depth} tree...")
+    existing = load_existing_model()
+    if existing is None:
+        return False
+    booster, bundle = existing
+    
+    df = pd.read_csv(DATA_PATH)
+    df['Disease'] = assign_diseases(df)
+    X = encode_with_bundle(df, bundle).to_numpy(dtype=np.float32)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(df)), test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=df['Disease']
+    )
+    
+    X_student = np.vstack([X[train_idx], synthetic_rows(X[train_idx], DISTILL_SYNTHETIC_ROWS)])
+    teacher_proba = booster.inplace_predict(X_student, validate_features=False)
+    student = DecisionTreeRegressor(max_depth=depth, min_samples_leaf=DISTILL_MIN_SAMPLES_LEAF,
+                                    random_state=RANDOM_STATE)
+    student.fit(X_student, teacher_proba)
+    
+    classes = bundle['disease_classes']
+    rules = {
+        "format_version": RULES_FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "teacher_model_sha256": bundle['model_sha256'],
+        "teacher_model_version": bundle['model_sha256'][:12],
+        "feature_columns": FEATURE_COLUMNS,
+        "categorical_classes": bundle['categorical_classes'],
+        "classes": classes,
+        "depth": int(student.get_depth()),
+        "leaves": int(student.get_n_leaves()),
+        "tree": tree_to_rules(student.tree_)
+    }
+    evaluator = DistilledRules(rules)
+    
+    # Fidelity of the exported rules on held-out records, as a gateway would send them
+    records = df.iloc[test_idx][FEATURE_COLUMNS].to_dict('records')
+    teacher_test = booster.inplace_predict(X[test_idx], validate_features=False)
+    student_test = np.array([evaluator.predict_proba(record) for record in records])
+    labels = df['Disease'].iloc[test_idx].to_numpy()
+    # And of the tree on unseen synthetic rows, which probe combinations outside the data
+    X_probe = synthetic_rows(X[train_idx], len(test_idx), seed=RANDOM_STATE + 1)
+    probe_agreement = (student.predict(X_probe).argmax(axis=1) ==
+                       booster.inplace_predict(X_probe, validate_features=False).argmax(axis=1)).mean()
+    
+    timings = []
+    for record in records[:SEARCH_LATENCY_ROWS]:
+        start = time.perf_counter()
+        evaluator.predict(record)
+        timings.append((time.perf_counter() - start) * 1000)
+    teacher_p50, teacher_p99 = measure_latency(
+        booster.save_raw(raw_format='ubj'),
+        X[test_idx][:SEARCH_LATENCY_ROWS].reshape(-1, 1, len(FEATURE_COLUMNS))
+    )
+    
+    rules["fidelity"] = {
+        "agreement": float((student_test.argmax(axis=1) == teacher_test.argmax(axis=1)).mean()),
+        "synthetic_agreement": float(probe_agreement),
+        "mean_abs_probability_diff": float(np.abs(student_test - teacher_test).mean()),
+        "teacher_accuracy": float((np.array(classes)[teacher_test.argmax(axis=1)] == labels).mean()),
+        "student_accuracy": float((np.array(classes)[student_test.argmax(axis=1)] == labels).mean()),
+        "test_rows": len(test_idx)
+    }
+    rules["latency_ms"] = {
+        "student_p50": float(np.percentile(timings, 50)),
+        "student_p99": float(np.percentile(timings, 99)),
+        "teacher_p50": teacher_p50,
+        "teacher_p99": teacher_p99
+    }
+    
+    tmp_path = temporary_path(DISTILLED_RULES_PATH)
+    with open(tmp_path, 'w') as f:
+        json.dump(rules, f, separators=(',', ':'))
+    os.replace(tmp_path, DISTILLED_RULES_PATH)
+    
+    fidelity, latency = rules["fidelity"], rules["latency_ms"]
+    print(f"✓ {rules['leaves']} leaves, depth {rules['depth']}, "
+          f"{os.path.getsize(DISTILLED_RULES_PATH) / 1024:.1f} KiB")
+    print(f"Agreement with the model: {fidelity['agreement']:.4f} on test rows, "
+          f"{fidelity['synthetic_agreement']:.4f} on synthetic rows")
+    print(f"Mean absolute probability difference: {fidelity['mean_abs_probability_diff']:.4f}")
+    print(f"Accuracy: model {fidelity['teacher_accuracy']:.4f}, rules {fidelity['student_accuracy']:.4f}")
+    print(f"Per-row latency (p50/p99 ms): rules in pure Python {latency['student_p50']:.3f}/"
+          f"{latency['student_p99']:.3f}, XGBoost booster {latency['teacher_p50']:.3f}/{latency['teacher_p99']:.3f}")
+    print(f"✓ Rules saved to {DISTILLED_RULES_PATH}")
+    return True
+
+def fit_encoders(df):
+    """Fit the categorical and target label encoders on a labelled dataframe"""
+    label_encoders = {}
+    for col in CATEGORICAL_COLUMNS:
+        le = LabelEncoder()
+        le.fit(df[col])
+        label_encoders[col] = le
+    
+    le_disease = LabelEncoder()
+    le_disease.fit(df['Disease'])
+    return label_encoders, le_disease
+
+def iter_data_chunks(data_path, chunk_rows=CHUNK_ROWS):
+    """Yield dataframes of at most chunk_rows rows from a CSV or Parquet file"""
+    if data_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(data_path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(data_path, chunksize=chunk_rows,
+                               dtype={col: str for col in CATEGORICAL_COLUMNS})
+
+def scan_categories(data_path, chunk_rows=CHUNK_ROWS):
+    """First pass over the data: fit the encoders without holding more than one chunk"""
+    categories = {col: set() for col in CATEGORICAL_COLUMNS}
+    disease_counts = pd.Series(dtype='int64')
+    for chunk in iter_data_chunks(data_path, chunk_rows):
+        for col in CATEGORICAL_COLUMNS:
+            categories[col].update(chunk[col].unique())
+        disease_counts = disease_counts.add(assign_diseases(chunk).value_counts(), fill_value=0)
+    
+    label_encoders = {col: LabelEncoder().fit(list(values)) for col, values in categories.items()}
+    le_disease = LabelEncoder().fit(disease_counts.index.tolist())
+    return label_encoders, le_disease, disease_counts.astype('int64')
+
+def is_test_row(chunk_index, n_rows, test_size=TEST_SIZE):
+    """Train/test assignment of a chunk's rows, identical on every pass over the data"""
+    return np.random.default_rng([RANDOM_STATE, chunk_index]).random(n_rows) < test_size
+
+def encode_chunk(chunk, label_encoders, le_disease):
+    """Label and encode one chunk into a float32 feature matrix and class codes"""
+    X = chunk[FEATURE_COLUMNS].copy()
+    for col in CATEGORICAL_COLUMNS:
+        X[col] = label_encoders[col].transform(X[col])
+    y = le_disease.transform(assign_diseases(chunk))
+    return X.to_numpy(dtype=np.float32), y
+
+class ChunkIterator(xgb.DataIter):
+    """Feed the train or test rows of a data file to XGBoost one chunk at a time"""
+    
+    def __init__(self, data_path, chunk_rows, label_encoders, le_disease, test, cache_prefix):
+        self.data_path = data_path
+        self.chunk_rows = chunk_rows
+        self.label_encoders = label_encoders
+        self.le_disease = le_disease
+        self.test = test
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+    
+    def reset(self):
+        self._chunks = enumerate(iter_data_chunks(self.data_path, self.chunk_rows))
+    
+    def next(self, input_data):
+        if self._chunks is None:
+            self.reset()
+        for chunk_index, chunk in self._chunks:
+            X, y = encode_chunk(chunk, self.label_encoders, self.le_disease)
+            rows = is_test_row(chunk_index, len(chunk)) == self.test
+            if rows.any():
+                input_data(data=X[rows], label=y[rows])
+                return 1
+        return 0
+
+def evaluate_chunked(booster, data_path, chunk_rows, label_encoders, le_disease):
+    """Stream the data once more and return (train accuracy, test accuracy)"""
+    correct = np.zeros(2)
+    total = np.zeros(2)
+    for chunk_index, chunk in enumerate(iter_data_chunks(data_path, chunk_rows)):
+        X, y = encode_chunk(chunk, label_encoders, le_disease)
+        hits = booster.inplace_predict(X, validate_features=False).argmax(axis=1) == y
+        test = is_test_row(chunk_index, len(chunk))
+        correct += [hits[~test].sum(), hits[test].sum()]
+        total += [(~test).sum(), test.sum()]
+    return tuple(correct / np.maximum(total, 1))
+
+def regenerate_model_chunked(data_path=DATA_PATH, chunk_rows=CHUNK_ROWS):
+    """Train out of core: stream the data in chunks into an external-memory DMatrix
+
+    Writes the native booster and an encoder bundle that names it as the model
+    file, which is what the service loads by default.
+    """
+    print("Regenerating ML model from streamed chunks...")
+    print(f"XGBoost version: {xgb.__version__}")
+    
+    if not os.path.exists(data_path):
+        print(f"Error: Data file '{data_path}' not found!")
+        return False
+    
+    print(f"Scanning {data_path} for categories and labels...")
+    label_encoders, le_disease, disease_counts = scan_categories(data_path, chunk_rows)
+    print("\nDisease distribution:")
+    print(disease_counts)
+    
+    params = {
+        'objective': 'multi:softprob',
+        'num_class': len(le_disease.classes_),
+        'max_depth': 6,
+        'eta': 0.1,
+        'tree_method': 'hist',
+        'eval_metric': 'mlogloss',
+        'seed': RANDOM_STATE,
+        'verbosity': 0
+    }
+    
+    print(f"Training XGBoost model on chunks of {chunk_rows} rows...")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        dtrain = xgb.DMatrix(ChunkIterator(
+            data_path, chunk_rows, label_encoders, le_disease,
+            test=False, cache_prefix=os.path.join(cache_dir, 'train')
+        ))
+        booster = xgb.train(params, dtrain, num_boost_round=100)
+        del dtrain
+    
+    train_accuracy, test_accuracy = evaluate_chunked(booster, data_path, chunk_rows, label_encoders, le_disease)
+    print(f"Train accuracy: {train_accuracy:.4f}")
+    print(f"Test accuracy: {test_accuracy:.4f}")
+    
+    save_booster(booster)
+    remove_stale_pickle()
+    save_encoder_bundle(build_encoder_bundle(label_encoders, le_disease, model_path=BOOSTER_PATH))
+    
+    print("\n✓ Chunked model regeneration completed successfully!")
+    return True
+
+class DeadlineCallback(xgb.callback.TrainingCallback):
+    """Stop boosting once the search's wall-clock budget is spent"""
+    
+    def __init__(self, deadline):
+        super().__init__()
+        self.deadline = deadline
+    
+    def after_iteration(self, model, epoch, evals_log):
+        return time.time() >= self.deadline
+
+def train_candidate(params, data, deadline):
+    """Train one search candidate with early stopping (runs in a worker process)"""
+    X_train, y_train, X_valid, y_valid, X_test, y_test = data
+    start = time.time()
+    if start >= deadline:
+        return None
+    
+    model = xgb.XGBClassifier(
+        n_estimators=SEARCH_MAX_ROUNDS,
+        early_stopping_rounds=SEARCH_EARLY_STOPPING_ROUNDS,
+        eval_metric='mlogloss',
+        random_state=RANDOM_STATE,
+        n_jobs=1,
+        verbosity=0,
+        callbacks=[DeadlineCallback(deadline)],
+        **params
+    )
+    model.fit(X_train, y_train, eval_set=[(X_valid, y_valid)], verbose=False)
+    
+    # Keep only the rounds up to the best validation score
+    rounds = model.best_iteration + 1
+    booster = model.get_booster()[:rounds]
+    predictions = booster.inplace_predict(X_test, validate_features=False).argmax(axis=1)
+    
+    return {
+        "params": params,
+        "rounds": rounds,
+        "accuracy": float((predictions == y_test).mean()),
+        "train_seconds": round(time.time() - start, 2),
+        "stopped_by_budget": time.time() >= deadline,
+        "model": bytes(booster.save_raw(raw_format='ubj'))
+    }
+
+def measure_latency(raw_model, rows):
+    """p50 and p99 single-row scoring time in milliseconds, one thread, as the service scores"""
+    booster = xgb.Booster()
+    booster.load_model(bytearray(raw_model))
+    booster.set_param({'nthread': 1})
+    
+    for row in rows[:50]:
+        booster.inplace_predict(row, validate_features=False)
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        booster.inplace_predict(row, validate_features=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 99))
+
+def rank_candidates(results, accuracy_floor):
+    """Fastest p99 first among models meeting the accuracy floor, then the rest by accuracy"""
+    meets_floor = sorted(
+        (r for r in results if r['accuracy'] >= accuracy_floor),
+        key=lambda r: (r['p99_ms'], -r['accuracy'])
+    )
+    below_floor = sorted(
+        (r for r in results if r['accuracy'] < accuracy_floor),
+        key=lambda r: (-r['accuracy'], r['p99_ms'])
+    )
+    return meets_floor, below_floor
+
+def search_hyperparameters(budget=300, workers=None, accuracy_floor=0.99, save_best=False):
+    """Train the SEARCH_SPACE grid in a process pool within a wall-clock budget
+
+    Candidates are trained in parallel, then timed one at a time so their
+    latencies are not skewed by each other. The report ranks the models that
+    meet accuracy_floor by p99 single-row latency.
+    """
+    print("Searching hyperparameters...")
+    print(f"XGBoost version: {xgb.__version__}")
+    deadline = time.time() + budget
+    
+    if not os.path.exists(DATA_PATH):
+        print(f"Error: Data file '{DATA_PATH}' not found!")
+        return False
+    
+    df = pd.read_csv(DATA_PATH)
+    df['Disease'] = assign_diseases(df)
+    label_encoders, le_disease = fit_encoders(df)
+    X = df[FEATURE_COLUMNS].copy()
+    for col in CATEGORICAL_COLUMNS:
+        X[col] = label_encoders[col].transform(X[col])
+    X = X.to_numpy(dtype=np.float32)
+    y = le_disease.transform(df['Disease'])
+    
+    # Same test split as regenerate_model(); early stopping watches a slice of the training rows
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
+    )
+    X_train, X_valid, y_train, y_valid = train_test_split(
+        X_train, y_train, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y_train
+    )
+    data = (X_train, y_train, X_valid, y_valid, X_test, y_test)
+    
+    candidates = [dict(zip(SEARCH_SPACE, values)) for values in itertools.product(*SEARCH_SPACE.values())]
+    workers = workers or os.cpu_count() or 1
+    print(f"Training {len(candidates)} candidates on {workers} processes, budget {budget}s...")
+    
+    results = []
+    abandoned = False
+    # spawn: forking after OpenMP threads have started can deadlock XGBoost
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        futures = {executor.submit(train_candidate, params, data, deadline): params for params in candidates}
+        # Running candidates stop boosting at the deadline, ones not started by then are skipped
+        for future in as_completed(futures, timeout=deadline - time.time() + SEARCH_GRACE_SECONDS):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"✗ Candidate {futures[future]} failed: {e}")
+                continue
+            if result is None:
+                continue
+            results.append(result)
+            note = " (stopped by budget)" if result['stopped_by_budget'] else ""
+            print(f"  {result['params']}: accuracy {result['accuracy']:.4f}, {result['rounds']} rounds{note}")
+    except FutureTimeoutError:
+        print("Candidates still running after the budget were abandoned")
+        abandoned = True
+    finally:
+        if len(results) < len(candidates):
+            print(f"Budget of {budget}s spent, {len(candidates) - len(results)} candidates not evaluated")
+        # Let idle workers exit before timing so they do not compete for the CPU
+        executor.shutdown(wait=not abandoned, cancel_futures=True)
+    
+    if not results:
+        print("Error: no candidate finished within the budget!")
+        return False
+    
+    # Time every model on the same single rows, one after another
+    latency_rows = X_test[:SEARCH_LATENCY_ROWS].reshape(-1, 1, len(FEATURE_COLUMNS))
+    for result in results:
+        result['p50_ms'], result['p99_ms'] = measure_latency(result['model'], latency_rows)
+    
+    meets_floor, below_floor = rank_candidates(results, accuracy_floor)
+    ranked = meets_floor + below_floor
+    
+    print(f"\nRanking (accuracy floor {accuracy_floor}):")
+    print(f"{'rank':>4}  {'floor':>5}  {'accuracy':>8}  {'p99 ms':>7}  {'p50 ms':>7}  {'rounds':>6}  params")
+    for rank, result in enumerate(ranked, 1):
+        print(f"{rank:>4}  {'ok' if result in meets_floor else '-':>5}  {result['accuracy']:>8.4f}  "
+              f"{result['p99_ms']:>7.3f}  {result['p50_ms']:>7.3f}  {result['rounds']:>6}  {result['params']}")
+    
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "xgboost_version": xgb.__version__,
+        "budget_seconds": budget,
+        "accuracy_floor": accuracy_floor,
+        "candidates_total": len(candidates),
+        "candidates_finished": len(results),
+        "best": ranked[0]['params'] if meets_floor else None,
+        "ranking": [{k: v for k, v in r.items() if k != 'model'} for r in ranked]
+    }
+    with open(SEARCH_REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Search report saved to {SEARCH_REPORT_PATH}")
+    
+    if not meets_floor:
+        print(f"No candidate reached the accuracy floor of {accuracy_floor}")
+        return not save_best
+    
+    best = meets_floor[0]
+    print(f"✓ Best: {best['params']} ({best['rounds']} rounds, accuracy {best['accuracy']:.4f}, p99 {best['p99_ms']:.3f} ms)")
+    if save_best:
+        booster = xgb.Booster()
+        booster.load_model(bytearray(best['model']))
+        save_booster(booster)
+        remove_stale_pickle()
+        save_encoder_bundle(build_encoder_bundle(label_encoders, le_disease, model_path=BOOSTER_PATH))
+    return True
+
+def export_existing_booster():
+    """Export the native booster from the existing pickled model and refresh the bundle"""
+    if not os.path.exists(MODEL_PATH):
+        print(f"Error: Model file '{MODEL_PATH}' not found!")
+        return False
+    
+    export_booster(joblib.load(MODEL_PATH))
+    return export_encoder_bundle()
+
+def export_encoder_bundle():
+    """Rebuild the encoder bundle for the existing model without retraining
+
+    A booster-only model (--chunked or --save-best removes the pickle) gets a
+    bundle that names the booster as its model file, as those exports write.
+    """
+    if (not os.path.exists(DATA_PATH)
+            or not any(os.path.exists(path) for path in (MODEL_PATH, BOOSTER_PATH))):
+        print(f"Error: '{DATA_PATH}' and '{MODEL_PATH}' or '{BOOSTER_PATH}' are required!")
+        return False
+    model_path = MODEL_PATH if os.path.exists(MODEL_PATH) else BOOSTER_PATH
+    
+    print("Loading data...")
+    df = pd.read_csv(DATA_PATH)
+    df['Disease'] = assign_diseases(df)
+    
+    label_encoders, le_disease = fit_encoders(df)
+    save_encoder_bundle(build_encoder_bundle(label_encoders, le_disease, model_path=model_path))
+    return True
 
 def regenerate_model():
     """Regenerate the ML model with current XGBoost version"""
@@ -55,39 +643,30 @@ def regenerate_model():
     print(f"XGBoost version: {xgb.__version__}")
     
     # Check if data file exists
-    if not os.path.exists('delhi_disease_data_10000.csv'):
-        print("Error: Data file 'delhi_disease_data_10000.csv' not found!")
+    if not os.path.exists(DATA_PATH):
+        print(f"Error: Data file '{DATA_PATH}' not found!")
         return False
     
     # Load data
     print("Loading data...")
-    df = pd.read_csv('delhi_disease_data_10000.csv')
+    df = pd.read_csv(DATA_PATH)
     
     # Assign diseases
     print("Assigning disease labels...")
-    df['Disease'] = df.apply(assign_disease, axis=1)
+    df['Disease'] = assign_diseases(df)
     
     # Print disease distribution
     print("\nDisease distribution:")
     print(df['Disease'].value_counts())
     
     # Prepare features
-    feature_columns = ['Week', 'Location', 'NDVI', 'WaterIndex', 'Rainfall_mm', 
-                      'Humidity_pct', 'FeverCases', 'Absenteeism_pct', 'ToiletUsage_pct']
-    
-    X = df[feature_columns].copy()
-    y = df['Disease']
+    X = df[FEATURE_COLUMNS].copy()
     
-    # Encode categorical features
-    label_encoders = {}
-    for col in ['Week', 'Location']:
-        le = LabelEncoder()
-        X[col] = le.fit_transform(X[col])
-        label_encoders[col] = le
-    
-    # Encode target
-    le_disease = LabelEncoder()
-    y_encoded = le_disease.fit_transform(y)
+    # Encode categorical features and target
+    label_encoders, le_disease = fit_encoders(df)
+    for col in CATEGORICAL_COLUMNS:
+        X[col] = label_encoders[col].transform(X[col])
+    y_encoded = le_disease.transform(df['Disease'])
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
@@ -114,10 +693,9 @@ def regenerate_model():
     print(f"Train accuracy: {train_accuracy:.4f}")
     print(f"Test accuracy: {test_accuracy:.4f}")
     
-    # Save model
-    model_path = "xgb_disease_prediction_model.pkl"
-    print(f"Saving model to {model_path}...")
-    joblib.dump(model, model_path)
+    # Save model and the encoder bundle the prediction service loads
+    model_path = MODEL_PATH
+    save_model_files(model, label_encoders, le_disease, model_path)
     
     # Test loading
     print("Testing model loading...")
@@ -159,7 +737,49 @@ def regenerate_model():
     return True
 
 if __name__ == "__main__":
-    success = regenerate_model()
+    parser = argparse.ArgumentParser(description='Regenerate the disease prediction model')
+    parser.add_argument('--bundle-only', action='store_true',
+                        help='Only rebuild the encoder bundle for the existing model file (the booster if there is no pickle)')
+    parser.add_argument('--export-booster', action='store_true',
+                        help='Export the native booster from the existing model file and rebuild the bundle')
+    parser.add_argument('--chunked', action='store_true',
+                        help='Train out of core, streaming the data in chunks (CSV or Parquet)')
+    parser.add_argument('--data', default=DATA_PATH,
+                        help=f'Training data for --chunked (default: {DATA_PATH})')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f'Rows per chunk for --chunked (default: {CHUNK_ROWS})')
+    parser.add_argument('--search', action='store_true',
+                        help='Search hyperparameters in a process pool and rank models by latency and accuracy')
+    parser.add_argument('--budget', type=float, default=300,
+                        help='Wall-clock budget in seconds for --search (default: 300)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes for --search (default: one per CPU)')
+    parser.add_argument('--accuracy-floor', type=float, default=0.99,
+                        help='Minimum test accuracy for --search to pick a model (default: 0.99)')
+    parser.add_argument('--save-best', action='store_true',
+                        help='With --search, save the fastest model that meets the accuracy floor')
+    parser.add_argument('--distill', action='store_true',
+                        help='Distill the existing model into JSON rules for offline scoring')
+    parser.add_argument('--distill-depth', type=int, default=DISTILL_DEPTH,
+                        help=f'Depth of the distilled tree (default: {DISTILL_DEPTH})')
+    parser.add_argument('--lookup-table', action='store_true',
+                        help='Precompute lookup table cells for the existing model from the training data')
+    args = parser.parse_args()
+    
+    if args.search:
+        success = search_hyperparameters(args.budget, args.workers, args.accuracy_floor, args.save_best)
+    elif args.distill:
+        success = distill_model(args.distill_depth)
+    elif args.chunked:
+        success = regenerate_model_chunked(args.data, args.chunk_rows)
+    elif args.lookup_table:
+        success = export_lookup_table()
+    elif args.export_booster:
+        success = export_existing_booster()
+    elif args.bundle_only:
+        success = export_encoder_bundle()
+    else:
+        success = regenerate_model()
     if success:
         print("\n🎉 Model is ready for use!")
     else:
@@ -0,0 +1,113 @@
+"""
+Shadow evaluation of a candidate model on live prediction traffic
+
+A sample of the records scored by the primary model is re-scored in a
+background thread by both models, off the response path, to measure how often
+they agree and how their inference latency compares.
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowEvaluator:
+    """Compare a candidate ModelState against the primary one on sampled records"""
+
+    def __init__(self, state, encode, predict, sample_rate, max_pending=4):
+        self.state = state
+        self.encode = encode
+        self.predict = predict
+        self.sample_rate = sample_rate
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow')
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.rows = 0
+        self.agreements = 0
+        self.abs_proba_diff = 0.0
+        self.primary_seconds = 0.0
+        self.shadow_seconds = 0.0
+        self.dropped = 0
+        self.errors = 0
+
+    def submit(self, records, primary_state):
+        """Queue a random sample of validated records; never blocks the caller"""
+        sample = [record for record in records if random.random() < self.sample_rate]
+        if not sample:
+            return False
+
+        # Drop the sample rather than queueing unbounded work behind a slow candidate
+        if not self._pending.acquire(blocking=False):
+            with self._lock:
+                self.dropped += len(sample)
+            return False
+
+        self._executor.submit(self._evaluate, sample, primary_state)
+        return True
+
+    def _timed_predict(self, records, state):
+        features = self.encode(records, state)
+        start = time.perf_counter()
+        prediction_proba = self.predict(features, state)
+        return prediction_proba, time.perf_counter() - start
+
+    def _evaluate(self, records, primary_state):
+        try:
+            primary_proba, primary_seconds = self._timed_predict(records, primary_state)
+            shadow_proba, shadow_seconds = self._timed_predict(records, self.state)
+
+            # Compare by class name in case the candidate orders its classes differently
+            primary_classes = primary_state.le_disease.classes_
+            shadow_classes = self.state.le_disease.classes_
+            agreements = int(np.sum(
+                primary_classes[primary_proba.argmax(axis=1)] == shadow_classes[shadow_proba.argmax(axis=1)]
+            ))
+            if list(primary_classes) == list(shadow_classes):
+                abs_proba_diff = float(np.abs(primary_proba - shadow_proba).mean(axis=1).sum())
+            else:
+                abs_proba_diff = float('nan')
+
+            with self._lock:
+                self.calls += 1
+                self.rows += len(records)
+                self.agreements += agreements
+                self.abs_proba_diff += abs_proba_diff
+                self.primary_seconds += primary_seconds
+                self.shadow_seconds += shadow_seconds
+
+        except Exception as e:
+            logger.error(f"Shadow evaluation failed: {str(e)}")
+            with self._lock:
+                self.errors += 1
+        finally:
+            self._pending.release()
+
+    def stats(self):
+        with self._lock:
+            calls, rows = self.calls, self.rows
+            primary_ms = self.primary_seconds * 1000 / calls if calls else None
+            shadow_ms = self.shadow_seconds * 1000 / calls if calls else None
+            return {
+                "model_version": self.state.model_version,
+                "model_format": self.state.model_format,
+                "sample_rate": self.sample_rate,
+                "calls": calls,
+                "rows": rows,
+                "agreement_rate": round(self.agreements / rows, 4) if rows else None,
+                "mean_abs_probability_diff": (
+                    round(self.abs_proba_diff / rows, 6)
+                    if rows and not np.isnan(self.abs_proba_diff) else None
+                ),
+                "primary_ms_per_call": round(primary_ms, 4) if calls else None,
+                "shadow_ms_per_call": round(shadow_ms, 4) if calls else None,
+                "latency_delta_ms_per_call": round(shadow_ms - primary_ms, 4) if calls else None,
+                "dropped_rows": self.dropped,
+                "errors": self.errors
+            }
@@ -7,15 +7,15 @@ echo "Starting Disease Prediction Service..."
 echo "========================================"
 
 # Check if required files exist
-if [ ! -f "xgb_disease_prediction_model.pkl" ]; then
-    echo "Error: Model file 'xgb_disease_prediction_model.pkl' not found!"
+if [ ! -f "xgb_disease_prediction_model.ubj" ] && [ ! -f "xgb_disease_prediction_model.pkl" ]; then
+    echo "Error: Model file 'xgb_disease_prediction_model.ubj' or 'xgb_disease_prediction_model.pkl' not found!"
     echo "Please ensure the model file is present in the container."
     exit 1
 fi
 
-if [ ! -f "delhi_disease_data_10000.csv" ]; then
-    echo "Error: Data file 'delhi_disease_data_10000.csv' not found!"
-    echo "Please ensure the data file is present in the container."
+if [ ! -f "disease_encoders.json" ]; then
+    echo "Error: Encoder bundle 'disease_encoders.json' not found!"
+    echo "Please ensure the encoder bundle is present in the container."
     exit 1
 fi
 
@@ -27,10 +27,19 @@ export FLASK_APP=app.py
 export FLASK_ENV=${FLASK_ENV:-production}
 export PYTHONPATH=/app
 
-# Start the Flask application
-echo "Starting Flask ML service on port 5001..."
+# Start the ML service: gunicorn with a preloaded model by default,
+# SERVER_MODE=asgi serves the micro-batching ASGI app on uvicorn workers and
+# SERVER_MODE=flask runs the single-process development server instead
+SERVER_MODE=${SERVER_MODE:-gunicorn}
+echo "Starting ML service on port 5001 (${SERVER_MODE})..."
 echo "Health check available at: http://localhost:5001/health"
 echo "========================================"
 
 # Run the application
-python app.py
+if [ "$SERVER_MODE" = "flask" ]; then
+    python app.py
+elif [ "$SERVER_MODE" = "asgi" ]; then
+    exec gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi_app:app
+else
+    exec gunicorn -c gunicorn.conf.py app:app
+fi
@@ -7,14 +7,15 @@ echo "Starting Disease Prediction API Server..."
 echo "========================================"
 
 # Check if required files exist
-if [ ! -f "xgb_disease_prediction_model.pkl" ]; then
-    echo "Error: Model file 'xgb_disease_prediction_model.pkl' not found!"
+if [ ! -f "xgb_disease_prediction_model.ubj" ] && [ ! -f "xgb_disease_prediction_model.pkl" ]; then
+    echo "Error: Model file 'xgb_disease_prediction_model.ubj' or 'xgb_disease_prediction_model.pkl' not found!"
     echo "Please run the Predictive_model.ipynb notebook first to train and save the model."
     exit 1
 fi
 
-if [ ! -f "delhi_disease_data_10000.csv" ]; then
-    echo "Error: Data file 'delhi_disease_data_10000.csv' not found!"
+if [ ! -f "disease_encoders.json" ]; then
+    echo "Error: Encoder bundle 'disease_encoders.json' not found!"
+    echo "Run 'python regenerate_model_v2.py --bundle-only' to generate it."
     exit 1
 fi
 
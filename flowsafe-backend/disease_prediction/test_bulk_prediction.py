@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Check that /predict/bulk flags invalid and empty numeric cells per row, and
+that streamed responses end with an error record when scoring fails midway
+
+Run with pytest or directly: python test_bulk_prediction.py
+"""
+
+import io
+import json
+import os
+
+import pandas as pd
+
+# app.py loads the model from paths relative to this directory at import time
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import app as prediction_app  # noqa: E402
+
+RECORD = {
+    "Week": "2025-W23", "Location": "Dwarka", "NDVI": 0.4, "WaterIndex": 0.3,
+    "Rainfall_mm": 12.0, "Humidity_pct": 70.0, "FeverCases": 5,
+    "Absenteeism_pct": 3.0, "ToiletUsage_pct": 60.0
+}
+
+
+def post_csv(frame):
+    client = prediction_app.app.test_client()
+    response = client.post('/predict/bulk', data=frame.to_csv(index=False), content_type='text/csv')
+    assert response.status_code == 200
+    return pd.read_csv(io.BytesIO(response.data))
+
+
+def test_empty_numeric_cells_are_row_errors():
+    frame = pd.DataFrame([RECORD] * 4)
+    frame['NDVI'] = frame['NDVI'].astype(object)
+    frame.loc[1, 'NDVI'] = None
+    frame.loc[2, 'NDVI'] = 'high'
+    result = post_csv(frame)
+
+    assert result['error'].isna().tolist() == [True, False, False, True]
+    assert result.loc[1, 'error'] == "Missing value for NDVI"
+    assert result.loc[2, 'error'] == "Invalid numeric value for NDVI"
+    assert result.loc[[1, 2], 'prediction'].isna().all()
+    assert result.loc[[0, 3], 'prediction'].notna().all()
+
+
+def test_valid_rows_match_predict():
+    result = post_csv(pd.DataFrame([RECORD]))
+    expected = prediction_app.app.test_client().post('/predict', json=RECORD).get_json()
+    assert result.loc[0, 'prediction'] == expected['prediction']
+    assert abs(result.loc[0, 'confidence'] - expected['confidence']) < 1e-6
+
+
+def fail_after_first_chunk(function):
+    """Wrap function so it raises from its second call on"""
+    calls = []
+    def wrapper(*args, **kwargs):
+        calls.append(1)
+        if len(calls) > 1:
+            raise RuntimeError("scoring failed")
+        return function(*args, **kwargs)
+    return wrapper
+
+
+def test_bulk_stream_ends_with_error_row():
+    original_rows, original_score = prediction_app.BULK_CHUNK_ROWS, prediction_app.score_bulk_frame
+    prediction_app.BULK_CHUNK_ROWS = 2
+    prediction_app.score_bulk_frame = fail_after_first_chunk(original_score)
+    try:
+        result = post_csv(pd.DataFrame([RECORD] * 5))
+    finally:
+        prediction_app.BULK_CHUNK_ROWS, prediction_app.score_bulk_frame = original_rows, original_score
+
+    assert result['index'].tolist()[:2] == [0, 1]
+    assert len(result) == 3
+    assert pd.isna(result.loc[2, 'index'])
+    assert result.loc[2, 'error'] == "scoring failed"
+
+
+def test_ndjson_stream_ends_with_error_summary():
+    original_rows, original_score = prediction_app.BATCH_STREAM_CHUNK_ROWS, prediction_app.score_records
+    prediction_app.BATCH_STREAM_CHUNK_ROWS = 2
+    prediction_app.score_records = fail_after_first_chunk(original_score)
+    try:
+        response = prediction_app.app.test_client().post(
+            '/predict/batch', json={"data": [RECORD] * 5, "stream": True}
+        )
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    finally:
+        prediction_app.BATCH_STREAM_CHUNK_ROWS, prediction_app.score_records = original_rows, original_score
+
+    assert response.status_code == 200
+    assert [line.get("index") for line in lines[:2]] == [0, 1]
+    assert lines[-1] == {
+        "error": "scoring failed", "total_predictions": 5, "successful_predictions": 2,
+        "model_version": prediction_app.model_state.model_version
+    }
+
+
+if __name__ == "__main__":
+    test_empty_numeric_cells_are_row_errors()
+    print("✓ Empty and invalid numeric cells are reported per row")
+    test_valid_rows_match_predict()
+    print("✓ Bulk predictions match /predict")
+    test_bulk_stream_ends_with_error_row()
+    print("✓ A bulk stream that fails midway ends with an error row")
+    test_ndjson_stream_ends_with_error_summary()
+    print("✓ An NDJSON stream that fails midway ends with an error summary")
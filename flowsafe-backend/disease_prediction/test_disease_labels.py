@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Check that the vectorized disease labelling matches the row-wise rules
+
+Run with pytest or directly: python test_disease_labels.py
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from disease_labels import assign_disease, assign_diseases
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'delhi_disease_data_10000.csv')
+
+
+def compare_labels(df):
+    """Return the indices of rows where the two implementations disagree"""
+    expected = df.apply(assign_disease, axis=1)
+    actual = assign_diseases(df)
+    return df.index[expected.to_numpy() != actual.to_numpy()]
+
+
+def test_bundled_csv():
+    df = pd.read_csv(DATA_PATH)
+    mismatches = compare_labels(df)
+    assert len(mismatches) == 0, f"{len(mismatches)} rows differ, first at {list(mismatches[:5])}"
+
+
+def test_rule_boundaries_and_missing_values():
+    # Values on and next to every threshold, plus missing values, in random combinations
+    rng = np.random.default_rng(0)
+    candidates = {
+        'Rainfall_mm': [49, 50, 51, 74, 75, 76, 99, 100, 101, np.nan],
+        'FeverCases': [9, 10, 11, 14, 15, 16, 19, 20, 21, 24, 25, 26, np.nan],
+        'Humidity_pct': [69, 70, 71, 79, 80, 81, 84, 85, 86, np.nan],
+        'ToiletUsage_pct': [69, 70, 71, 74, 75, 76, 79, 80, 81, np.nan],
+        'WaterIndex': [0.39, 0.4, 0.41, 0.49, 0.5, 0.51, 0.59, 0.6, 0.61, np.nan],
+        'NDVI': [0.39, 0.4, 0.41, 0.49, 0.5, 0.51, 0.59, 0.6, 0.61, np.nan],
+        'Absenteeism_pct': [4, 5, 6, 9, 10, 11, np.nan],
+    }
+    df = pd.DataFrame({col: rng.choice(values, size=20000) for col, values in candidates.items()})
+    mismatches = compare_labels(df)
+    assert len(mismatches) == 0, f"{len(mismatches)} rows differ, first at {list(mismatches[:5])}"
+
+
+if __name__ == "__main__":
+    test_bundled_csv()
+    print("✓ Vectorized labels match the row-wise rules on the bundled CSV")
+    test_rule_boundaries_and_missing_values()
+    print("✓ Vectorized labels match the row-wise rules on threshold boundaries and missing values")
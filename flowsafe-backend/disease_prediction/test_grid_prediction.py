@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Check that every /predict/grid cell matches /predict for the same record
+
+Run with pytest or directly: python test_grid_prediction.py
+"""
+
+import os
+
+# app.py loads the model from paths relative to this directory at import time
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import app as prediction_app  # noqa: E402
+
+INPUTS = {
+    "NDVI": 0.45, "WaterIndex": 0.6, "Rainfall_mm": 120.0, "Humidity_pct": 85.0,
+    "FeverCases": 30, "Absenteeism_pct": 15.0, "ToiletUsage_pct": 70.0
+}
+
+
+def post(path, payload):
+    return prediction_app.app.test_client().post(path, json=payload)
+
+
+def test_cells_match_single_predictions():
+    locations = prediction_app.model_state.available_locations[:3]
+    weeks = prediction_app.model_state.available_weeks[:2]
+    overrides = {locations[1]: {"FeverCases": 45}}
+    response = post('/predict/grid', {
+        "inputs": INPUTS, "overrides": overrides, "locations": locations, "weeks": weeks
+    })
+    assert response.status_code == 200
+    grid = response.get_json()
+    assert grid["model_version"] == prediction_app.model_state.model_version
+
+    for i, location in enumerate(locations):
+        for j, week in enumerate(weeks):
+            record = dict(INPUTS, **overrides.get(location, {}), Location=location, Week=week)
+            expected = post('/predict', record).get_json()
+            assert grid["classes"][grid["prediction"][i][j]] == expected["prediction"]
+            for class_name, probability in expected["probabilities"].items():
+                assert abs(grid["probabilities"][class_name][i][j] - probability) < 1e-6
+
+
+def test_defaults_to_every_location_and_week():
+    grid = post('/predict/grid', {"inputs": INPUTS, "include_probabilities": False}).get_json()
+    state = prediction_app.model_state
+    assert grid["locations"] == state.available_locations
+    assert grid["weeks"] == state.available_weeks
+    assert len(grid["confidence"]) == len(state.available_locations)
+    assert "probabilities" not in grid
+
+
+def test_invalid_requests_are_rejected():
+    assert post('/predict/grid', {"inputs": INPUTS, "locations": ["Atlantis"]}).status_code == 400
+    assert post('/predict/grid', {"inputs": dict(INPUTS, NDVI="high")}).status_code == 400
+    assert post('/predict/grid', {"inputs": {"NDVI": 0.4}}).status_code == 400
+
+
+if __name__ == "__main__":
+    test_cells_match_single_predictions()
+    print("✓ Grid cells match /predict, including location overrides")
+    test_defaults_to_every_location_and_week()
+    print("✓ The grid defaults to every location and week")
+    test_invalid_requests_are_rejected()
+    print("✓ Unknown locations, invalid values and missing inputs are rejected")
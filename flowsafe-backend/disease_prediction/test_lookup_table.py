@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Check the lookup table's binning and that its cells reproduce the model exactly
+
+Run with pytest or directly: python test_lookup_table.py
+"""
+
+import os
+
+import numpy as np
+import xgboost as xgb
+
+from lookup_table import LookupTable, bin_features, split_thresholds
+
+BOOSTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'xgb_disease_prediction_model.ubj')
+
+
+def load_booster():
+    booster = xgb.Booster()
+    booster.load_model(BOOSTER_PATH)
+    return booster
+
+
+def booster_predict(booster):
+    return lambda rows: booster.inplace_predict(rows, validate_features=False)
+
+
+def test_values_on_a_threshold_bin_to_its_right():
+    thresholds = [np.array([1.0, 2.0], dtype=np.float32)]
+    features = np.array([[0.5], [1.0], [1.5], [2.0], [3.0], [np.nan]], dtype=np.float32)
+    bins, missing = bin_features(thresholds, features)
+    assert bins[:, 0].tolist()[:5] == [0, 1, 1, 2, 2]
+    assert missing.tolist() == [False] * 5 + [True]
+
+
+def test_rows_in_one_cell_share_the_model_output():
+    booster = load_booster()
+    thresholds = split_thresholds(booster)
+    rng = np.random.default_rng(0)
+    features = rng.uniform(0, 100, size=(200, booster.num_features())).astype(np.float32)
+    bins, _ = bin_features(thresholds, features)
+
+    # Move every value to the lowest point of its bin: same cell, different row
+    lowest = np.empty_like(features)
+    for f, feature_thresholds in enumerate(thresholds):
+        edges = np.concatenate([[np.float32(-1e6)], feature_thresholds])
+        lowest[:, f] = edges[bins[:, f]]
+    assert (bin_features(thresholds, lowest)[0] == bins).all()
+
+    predict = booster_predict(booster)
+    assert np.array_equal(predict(features), predict(lowest))
+
+
+def test_table_serves_exact_probabilities_and_falls_back_on_missing_values():
+    booster = load_booster()
+    predict = booster_predict(booster)
+    table = LookupTable.from_booster(booster, maxsize=1000)
+    rng = np.random.default_rng(1)
+    features = rng.uniform(0, 100, size=(50, booster.num_features())).astype(np.float32)
+    features[0, 3] = np.nan
+
+    first = table.predict(features, predict)
+    second = table.predict(features, predict)
+    assert np.array_equal(first, predict(features))
+    assert np.array_equal(second, first)
+
+    stats = table.stats()
+    assert stats["hits"] == 49
+    # The row with a missing value is scored by the model both times
+    assert stats["missing_value_fallbacks"] == 2
+
+
+if __name__ == "__main__":
+    test_values_on_a_threshold_bin_to_its_right()
+    print("✓ Values on a threshold fall in the bin to its right")
+    test_rows_in_one_cell_share_the_model_output()
+    print("✓ Rows in one cell get the same probabilities from the model")
+    test_table_serves_exact_probabilities_and_falls_back_on_missing_values()
+    print("✓ The table serves the model's exact probabilities and skips rows with missing values")
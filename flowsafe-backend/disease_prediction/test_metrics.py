@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Check that /metrics parses as Prometheus text and counts what a request did,
+in one process and merged across gunicorn-style worker processes
+
+Run with pytest or directly: python test_metrics.py
+"""
+
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from prometheus_client.parser import text_string_to_metric_families
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# app.py loads the model from paths relative to this directory at import time
+os.chdir(HERE)
+
+import app as prediction_app  # noqa: E402
+
+STAGES = ('parse', 'validate', 'preprocess', 'inference', 'serialize')
+
+
+def unique_record(location="Dwarka"):
+    # A value no other request used, so the prediction cache cannot skip inference
+    return {
+        "Week": "2025-W23", "Location": location, "NDVI": 0.3, "WaterIndex": 0.7,
+        "Rainfall_mm": 120, "FeverCases": random.randint(10, 10**6), "Humidity_pct": 80,
+        "ToiletUsage_pct": 70, "Absenteeism_pct": 8
+    }
+
+
+def scrape(text):
+    """{(sample name, labels): value} for every sample of an exposition"""
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+    }
+
+
+def sample(samples, name, **labels):
+    return samples.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def get_metrics(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    return scrape(response.get_data(as_text=True))
+
+
+def test_request_counts_stages_and_unseen_categories():
+    client = prediction_app.app.test_client()
+    before = get_metrics(client)
+
+    assert client.post('/predict', json=unique_record()).status_code == 200
+    # The default 'first' policy still scores a record with an unseen location
+    assert client.post('/predict', json=unique_record(location="Atlantis")).status_code == 200
+    after = get_metrics(client)
+
+    for stage in STAGES:
+        name = 'prediction_stage_seconds_count'
+        assert sample(after, name, stage=stage) >= sample(before, name, stage=stage) + 2, stage
+    assert sample(after, 'prediction_stage_seconds_sum', stage='inference') > \
+        sample(before, 'prediction_stage_seconds_sum', stage='inference')
+    assert sample(after, 'prediction_request_seconds_count', endpoint='/predict') == \
+        sample(before, 'prediction_request_seconds_count', endpoint='/predict') + 2
+    assert sample(after, 'prediction_unseen_categories_total', column='Location') == \
+        sample(before, 'prediction_unseen_categories_total', column='Location') + 1
+
+
+WORKER = """
+import os, sys
+os.chdir(sys.argv[1])
+sys.path.insert(0, sys.argv[1])
+import app
+response = app.app.test_client().post('/predict', json={
+    "Week": "2025-W23", "Location": "Atlantis", "NDVI": 0.3, "WaterIndex": 0.7, "Rainfall_mm": 120,
+    "FeverCases": 30, "Humidity_pct": 80, "ToiletUsage_pct": 70, "Absenteeism_pct": 8
+})
+assert response.status_code == 200
+if len(sys.argv) > 2:
+    sys.stdout.write(app.app.test_client().get('/metrics').get_data(as_text=True))
+"""
+
+
+def test_metrics_are_merged_across_worker_processes():
+    with tempfile.TemporaryDirectory() as multiproc_dir:
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=multiproc_dir, MODEL_RELOAD='False')
+        # The first worker exits before the second one answers the scrape
+        subprocess.run([sys.executable, '-c', WORKER, HERE], env=env, check=True, capture_output=True)
+        scraped = subprocess.run([sys.executable, '-c', WORKER, HERE, 'scrape'], env=env, check=True,
+                                 capture_output=True, text=True)
+
+    samples = scrape(scraped.stdout)
+    assert sample(samples, 'prediction_unseen_categories_total', column='Location') == 2
+    assert sample(samples, 'prediction_request_seconds_count', endpoint='/predict') == 2
+    assert sample(samples, 'prediction_stage_seconds_count', stage='validate') == 2
+
+
+if __name__ == "__main__":
+    test_request_counts_stages_and_unseen_categories()
+    print("✓ A request is counted in every stage, its endpoint and the unseen categories")
+    test_metrics_are_merged_across_worker_processes()
+    print("✓ /metrics merges the values of every worker process, including exited ones")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Check when the model watcher reloads, retries and swaps in a new model
+
+Run with pytest or directly: python test_model_watcher.py
+"""
+
+from types import SimpleNamespace
+
+from model_store import ModelWatcher
+
+MODEL_PATH = 'model.ubj'
+
+
+def make_state(version, signatures):
+    return SimpleNamespace(model_version=version, model_path=MODEL_PATH, signatures=dict(signatures))
+
+
+class StubLoader:
+    """Serves the signatures it is given and loads whatever load_result says"""
+
+    def __init__(self, signatures):
+        self.files = dict(signatures)
+        self.load_result = None
+        self.loads = 0
+
+    def signatures(self):
+        return dict(self.files)
+
+    def load(self, strict=False):
+        assert strict
+        self.loads += 1
+        if isinstance(self.load_result, Exception):
+            raise self.load_result
+        return make_state(self.load_result, self.files)
+
+
+def make_watcher():
+    files = {MODEL_PATH: (1, 100), 'model.pkl': (1, 200), 'bundle.json': (1, 10)}
+    loader = StubLoader(files)
+    current = [make_state('v1', files)]
+    watcher = ModelWatcher(loader, lambda: current[0], lambda state: current.__setitem__(0, state), interval=1)
+    return watcher, loader, current
+
+
+def test_no_reload_while_files_keep_changing():
+    watcher, loader, current = make_watcher()
+    loader.load_result = 'v2'
+    for tick in range(2, 6):
+        loader.files[MODEL_PATH] = (tick, 100)
+        assert watcher.check() is False
+    assert loader.loads == 0
+    assert current[0].model_version == 'v1'
+
+
+def test_good_update_is_swapped_in_once_the_files_settle():
+    watcher, loader, current = make_watcher()
+    loader.load_result = 'v2'
+    loader.files[MODEL_PATH] = (2, 100)
+    loader.files['bundle.json'] = (2, 10)
+
+    assert watcher.check() is False
+    assert watcher.check() is True
+    assert current[0].model_version == 'v2'
+    # The swapped state carries the new signatures, so nothing is reloaded again
+    assert watcher.check() is False
+    assert loader.loads == 1
+
+
+def test_mismatched_bundle_keeps_the_current_model_without_retrying():
+    watcher, loader, current = make_watcher()
+    loader.load_result = ValueError("bundle was not generated for the current model.ubj")
+    loader.files[MODEL_PATH] = (2, 100)
+
+    assert watcher.check() is False
+    assert watcher.check() is False
+    for _ in range(3):
+        assert watcher.check() is False
+    assert loader.loads == 1
+    assert current[0].model_version == 'v1'
+
+    # Writing the matching bundle is a new set of signatures, which is loaded
+    loader.load_result = 'v2'
+    loader.files['bundle.json'] = (2, 10)
+    assert watcher.check() is False
+    assert watcher.check() is True
+    assert current[0].model_version == 'v2'
+
+
+def test_change_that_serves_the_same_model_is_not_swapped():
+    watcher, loader, current = make_watcher()
+    # Only the pickle changed; the booster and bundle, and so the served model, did not
+    loader.load_result = 'v1'
+    loader.files['model.pkl'] = (2, 300)
+    previous = current[0]
+
+    assert watcher.check() is False
+    assert watcher.check() is False
+    assert watcher.check() is False
+    assert loader.loads == 1
+    assert current[0] is previous
+
+
+if __name__ == "__main__":
+    test_no_reload_while_files_keep_changing()
+    print("✓ Files that keep changing are not loaded")
+    test_good_update_is_swapped_in_once_the_files_settle()
+    print("✓ A good update is swapped in once its files settle")
+    test_mismatched_bundle_keeps_the_current_model_without_retrying()
+    print("✓ A mismatched bundle keeps the current model and is not retried")
+    test_change_that_serves_the_same_model_is_not_swapped()
+    print("✓ A change that serves the same model is not swapped in")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Check the LRU eviction, TTL expiry and counters of the prediction cache
+
+Run with pytest or directly: python test_prediction_cache.py
+"""
+
+from prediction_cache import PredictionCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(maxsize=2, ttl=60)
+    cache.put_many([('a', 1), ('b', 2)])
+    # Reading 'a' makes 'b' the least recently used entry
+    assert cache.get_many(['a']) == [1]
+    cache.put_many([('c', 3)])
+    assert cache.get_many(['a', 'b', 'c']) == [1, None, 3]
+
+
+def test_entries_expire_after_ttl():
+    cache = PredictionCache(maxsize=10, ttl=0)
+    cache.put_many([('a', 1)])
+    assert cache.get_many(['a']) == [None]
+    # The expired entry is removed on lookup
+    assert cache.stats()["size"] == 0
+
+
+def test_put_replaces_value_and_refreshes_position():
+    cache = PredictionCache(maxsize=2, ttl=60)
+    cache.put_many([('a', 1), ('b', 2), ('a', 10)])
+    cache.put_many([('c', 3)])
+    assert cache.get_many(['a', 'b', 'c']) == [10, None, 3]
+
+
+def test_disabled_cache_stores_nothing():
+    cache = PredictionCache(maxsize=0, ttl=60)
+    assert not cache.enabled
+    cache.put_many([('a', 1)])
+    assert cache.get_many(['a']) == [None]
+
+
+def test_stats_count_hits_and_misses():
+    cache = PredictionCache(maxsize=10, ttl=60)
+    cache.put_many([('a', 1)])
+    cache.get_many(['a', 'a', 'b'])
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 1, 0.6667)
+    cache.clear()
+    assert cache.stats()["size"] == 0
+
+
+if __name__ == "__main__":
+    test_least_recently_used_entry_is_evicted()
+    print("✓ The least recently used entry is evicted")
+    test_entries_expire_after_ttl()
+    print("✓ Entries expire after the TTL")
+    test_put_replaces_value_and_refreshes_position()
+    print("✓ Storing a key again replaces its value and refreshes it")
+    test_disabled_cache_stores_nothing()
+    print("✓ A cache of size 0 stores nothing")
+    test_stats_count_hits_and_misses()
+    print("✓ Hits and misses are counted")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Check the shadow evaluator's sampling, dropping and agreement statistics
+
+The primary model doubles as the candidate, so every sampled row must agree
+with no probability difference.
+
+Run with pytest or directly: python test_shadow.py
+"""
+
+import os
+import threading
+import time
+
+# app.py loads the model from paths relative to this directory at import time
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import app as prediction_app  # noqa: E402
+from shadow import ShadowEvaluator  # noqa: E402
+
+RECORDS = [
+    {"Week": week, "Location": location, "NDVI": 0.3, "WaterIndex": 0.7, "Rainfall_mm": rainfall,
+     "FeverCases": fever, "Humidity_pct": 80, "ToiletUsage_pct": 70, "Absenteeism_pct": 8}
+    for week, location, rainfall, fever in [
+        ("2025-W23", "Dwarka", 120, 30), ("2025-W24", "Rohini", 5, 2), ("2025-W30", "Saket", 300, 90)
+    ]
+]
+
+
+def make_evaluator(sample_rate=1.0, predict=None, max_pending=4):
+    return ShadowEvaluator(prediction_app.model_state, prediction_app.build_feature_matrix,
+                           predict or prediction_app.predict_backend, sample_rate, max_pending=max_pending)
+
+
+def wait_for_calls(evaluator, calls, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while evaluator.stats()["calls"] + evaluator.stats()["errors"] < calls and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return evaluator.stats()
+
+
+def test_same_model_agrees_on_every_sampled_row():
+    evaluator = make_evaluator()
+    assert evaluator.submit(RECORDS, prediction_app.model_state)
+    assert evaluator.submit(RECORDS[:1], prediction_app.model_state)
+    stats = wait_for_calls(evaluator, 2)
+
+    assert (stats["calls"], stats["rows"], stats["errors"], stats["dropped_rows"]) == (2, 4, 0, 0)
+    assert stats["agreement_rate"] == 1.0
+    assert stats["mean_abs_probability_diff"] == 0.0
+    assert stats["primary_ms_per_call"] > 0 and stats["shadow_ms_per_call"] > 0
+
+
+def test_nothing_is_queued_at_a_zero_sample_rate():
+    evaluator = make_evaluator(sample_rate=0.0)
+    assert not evaluator.submit(RECORDS, prediction_app.model_state)
+    stats = evaluator.stats()
+    assert (stats["calls"], stats["rows"], stats["agreement_rate"]) == (0, 0, None)
+
+
+def test_samples_are_dropped_while_the_candidate_is_behind():
+    release = threading.Event()
+
+    def slow_predict(features, state):
+        release.wait(5)
+        return prediction_app.predict_backend(features, state)
+
+    evaluator = make_evaluator(predict=slow_predict, max_pending=1)
+    assert evaluator.submit(RECORDS, prediction_app.model_state)
+    assert not evaluator.submit(RECORDS[:2], prediction_app.model_state)
+    release.set()
+    stats = wait_for_calls(evaluator, 1)
+
+    assert (stats["calls"], stats["rows"], stats["dropped_rows"]) == (1, 3, 2)
+    # The slot is free again once the evaluation finished
+    assert evaluator.submit(RECORDS[:1], prediction_app.model_state)
+    assert wait_for_calls(evaluator, 2)["rows"] == 4
+
+
+def test_health_shadow_reports_live_traffic():
+    evaluator = make_evaluator()
+    previous, prediction_app.shadow_evaluator = prediction_app.shadow_evaluator, evaluator
+    try:
+        client = prediction_app.app.test_client()
+        assert client.post('/predict', json=RECORDS[0]).status_code == 200
+        assert client.post('/predict/batch', json={"data": RECORDS[1:]}).status_code == 200
+        wait_for_calls(evaluator, 2)
+        stats = client.get('/health/shadow').get_json()
+    finally:
+        prediction_app.shadow_evaluator = previous
+
+    assert (stats["calls"], stats["rows"]) == (2, 3)
+    assert stats["agreement_rate"] == 1.0
+    assert stats["mean_abs_probability_diff"] == 0.0
+
+
+if __name__ == "__main__":
+    test_same_model_agrees_on_every_sampled_row()
+    print("✓ The same model agrees on every sampled row with no probability difference")
+    test_nothing_is_queued_at_a_zero_sample_rate()
+    print("✓ Nothing is sampled at a zero sample rate")
+    test_samples_are_dropped_while_the_candidate_is_behind()
+    print("✓ Samples are dropped while the candidate is behind")
+    test_health_shadow_reports_live_traffic()
+    print("✓ /health/shadow reports the records sampled from live traffic")
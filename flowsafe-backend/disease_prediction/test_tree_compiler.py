@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Check that the compiled evaluator reproduces XGBoost's output bit for bit
+
+Run with pytest or directly: python test_tree_compiler.py
+"""
+
+import os
+
+import numpy as np
+import xgboost as xgb
+
+from tree_compiler import CompiledEnsemble, compile_booster, validation_matrix
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+BOOSTER_PATH = os.path.join(MODEL_DIR, 'xgb_disease_prediction_model.ubj')
+
+
+def load_booster():
+    booster = xgb.Booster()
+    booster.load_model(BOOSTER_PATH)
+    return booster
+
+
+def assert_bitwise_equal(actual, expected):
+    actual = np.asarray(actual, dtype=np.float32)
+    expected = np.asarray(expected, dtype=np.float32)
+    assert actual.shape == expected.shape
+    differ = actual.view(np.uint32) != expected.view(np.uint32)
+    assert not differ.any(), f"{int(differ.any(axis=-1).sum())} rows differ"
+
+
+def test_parity_on_threshold_rows():
+    booster = load_booster()
+    compiled = compile_booster(booster)
+    # A different seed from the load-time check, so the rows are new
+    features = validation_matrix(compiled, booster.num_features(), rows=2000, seed=1)
+    assert_bitwise_equal(compiled.predict(features), booster.inplace_predict(features, validate_features=False))
+
+
+def test_parity_on_random_rows_and_batch_sizes():
+    booster = load_booster()
+    compiled = CompiledEnsemble.from_booster(booster)
+    rng = np.random.default_rng(0)
+    features = rng.uniform(0, 100, size=(1000, booster.num_features())).astype(np.float32)
+    features[rng.random(features.shape) < 0.05] = np.nan
+    expected = booster.inplace_predict(features, validate_features=False)
+
+    # Chunking must not change any row's result
+    for size in (1, 7, 128, 129, 1000):
+        assert_bitwise_equal(compiled.predict(features[:size]), expected[:size])
+
+
+def test_empty_batch():
+    compiled = CompiledEnsemble.from_booster(load_booster())
+    features = np.empty((0, 9), dtype=np.float32)
+    assert compiled.predict(features).shape == (0, compiled.n_classes)
+
+
+if __name__ == "__main__":
+    test_parity_on_threshold_rows()
+    print("✓ Compiled probabilities match XGBoost on threshold rows")
+    test_parity_on_random_rows_and_batch_sizes()
+    print("✓ Compiled probabilities match XGBoost on random rows at every batch size")
+    test_empty_batch()
+    print("✓ Empty batches return an empty matrix")
@@ -0,0 +1,235 @@
+"""
+Compile an XGBoost booster into flat NumPy arrays and evaluate it without XGBoost
+
+Every tree node of the ensemble is stored in contiguous arrays (feature, threshold,
+children, default direction, leaf value). A batch is scored by walking all trees
+for all rows at once, one tree level per step, then summing leaves and applying
+the softmax in the same order and precision as XGBoost's CPU predictor, so the
+result can be checked bit for bit against the booster it was compiled from.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_OBJECTIVES = ('multi:softprob',)
+
+# Rows walked through the trees at once, keeping the (rows, trees) scratch arrays in cache
+CHUNK_ROWS = 128
+
+
+def _load_expf():
+    """The C library's expf, which XGBoost's softmax calls, or None if unavailable"""
+    path = ctypes.util.find_library('m')
+    if path is None:
+        return None
+    try:
+        expf = ctypes.CDLL(path).expf
+    except (OSError, AttributeError):
+        return None
+    expf.restype = ctypes.c_float
+    expf.argtypes = [ctypes.c_float]
+    return expf
+
+
+_expf = _load_expf()
+
+
+def float32_exp(x):
+    """exp of a float32 array, rounded the way the C library's expf rounds it
+
+    expf is accurate to about 0.502 ulp, so it can only differ from the correctly
+    rounded float64 result when that lies next to a float32 rounding midpoint. Those
+    few values are recomputed with expf itself.
+    """
+    exact = np.exp(x.astype(np.float64))
+    result = exact.astype(np.float32)
+    if _expf is not None:
+        ulp = np.spacing(result).astype(np.float64)
+        near_midpoint = np.abs(np.abs(exact - result) / ulp - 0.5) < 0.005
+        if near_midpoint.any():
+            result[near_midpoint] = [_expf(value) for value in x[near_midpoint].tolist()]
+    return result
+
+
+def parse_base_score(value, n_classes):
+    """base_score is a scalar in XGBoost 1.x and a per-class vector in later versions"""
+    values = [float(v) for v in str(value).strip('[]').split(',')]
+    if len(values) == 1:
+        values = values * n_classes
+    if len(values) != n_classes:
+        raise ValueError(f"Unexpected base_score {value!r} for {n_classes} classes")
+    return np.array(values, dtype=np.float32)
+
+
+class CompiledEnsemble:
+    """Flat-array evaluator for a multi:softprob gbtree model"""
+
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 roots, tree_class, base_score, max_depth):
+        self.n_classes = len(base_score)
+        counts = np.bincount(tree_class, minlength=self.n_classes)
+        if len(counts) != self.n_classes or (counts != counts[0]).any():
+            raise ValueError("Every class must have the same number of trees")
+
+        # Node n is addressed as slot 2n, and slot 2n + 1 (go right) holds its right
+        # child, so one lookup with the comparison result picks the next node
+        self.feature = np.repeat(feature, 2).astype(np.intp)
+        self.threshold = np.repeat(threshold, 2)
+        self.default_right = np.repeat(~default_left, 2)
+        self.value = np.repeat(value, 2)
+        self.children = np.stack([left, right], axis=1).ravel().astype(np.intp) * 2
+        # Roots grouped by class, keeping boosting order within each class
+        self.roots = roots[np.argsort(tree_class, kind='stable')].astype(np.intp) * 2
+        self.trees_per_class = int(counts[0])
+        self.base_score = base_score
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_booster(cls, booster):
+        """Flatten the booster's JSON dump into node arrays"""
+        model = json.loads(bytes(booster.save_raw(raw_format='json')))
+        learner = model['learner']
+        objective = learner['objective']['name']
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Unsupported objective for compiled inference: {objective}")
+        if learner['gradient_booster']['name'] != 'gbtree':
+            raise ValueError("Compiled inference only supports gbtree models")
+
+        n_classes = int(learner['learner_model_param']['num_class'])
+        base_score = parse_base_score(learner['learner_model_param']['base_score'], n_classes)
+        trees = learner['gradient_booster']['model']['trees']
+        tree_class = np.array(learner['gradient_booster']['model']['tree_info'], dtype=np.int32)
+
+        features, thresholds, lefts, rights, defaults, values, roots = [], [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for tree in trees:
+            if tree['categories_nodes']:
+                raise ValueError("Compiled inference does not support categorical splits")
+
+            left = np.array(tree['left_children'], dtype=np.int32)
+            right = np.array(tree['right_children'], dtype=np.int32)
+            conditions = np.array(tree['split_conditions'], dtype=np.float32)
+            is_leaf = left == -1
+            node_ids = np.arange(len(left), dtype=np.int32)
+
+            # Leaves point at themselves so extra traversal steps leave them in place
+            lefts.append(np.where(is_leaf, node_ids, left) + offset)
+            rights.append(np.where(is_leaf, node_ids, right) + offset)
+            features.append(np.where(is_leaf, 0, tree['split_indices']).astype(np.int32))
+            thresholds.append(np.where(is_leaf, 0, conditions).astype(np.float32))
+            defaults.append(np.array(tree['default_left'], dtype=bool))
+            # A leaf's split condition holds its value
+            values.append(np.where(is_leaf, conditions, 0).astype(np.float32))
+            roots.append(offset)
+
+            depth = np.zeros(len(left), dtype=np.int32)
+            for node in range(len(left)):
+                if not is_leaf[node]:
+                    depth[left[node]] = depth[right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+            offset += len(left)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            default_left=np.concatenate(defaults),
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.int32),
+            tree_class=tree_class,
+            base_score=base_score,
+            max_depth=max_depth
+        )
+
+    def leaf_values(self, features):
+        """Leaf value reached in every tree, shape (rows, trees) with trees grouped by class"""
+        n_rows, n_features = features.shape
+        flat = features.ravel()
+        row_start = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        slot = np.broadcast_to(self.roots, (n_rows, len(self.roots)))
+        has_missing = np.isnan(flat).any()
+
+        for _ in range(self.max_depth):
+            x = np.take(flat, row_start + np.take(self.feature, slot))
+            # x < threshold goes left, missing values follow the default branch
+            go_right = x >= np.take(self.threshold, slot)
+            if has_missing:
+                go_right |= np.isnan(x) & np.take(self.default_right, slot)
+            slot = np.take(self.children, slot + go_right)
+        return np.take(self.value, slot)
+
+    def _margins(self, features):
+        n_rows = len(features)
+        leaves = self.leaf_values(features).reshape(n_rows, self.n_classes, self.trees_per_class)
+        # Sum sequentially in float32 from base_score, tree by tree like XGBoost
+        terms = np.empty((n_rows, self.n_classes, self.trees_per_class + 1), dtype=np.float32)
+        terms[:, :, 0] = self.base_score
+        terms[:, :, 1:] = leaves
+        return np.add.accumulate(terms, axis=2, dtype=np.float32)[:, :, -1]
+
+    def predict_margin(self, features):
+        """Untransformed per-class scores for a float32 feature matrix"""
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        return np.concatenate([
+            self._margins(features[start:start + CHUNK_ROWS])
+            for start in range(0, len(features), CHUNK_ROWS)
+        ] or [np.empty((0, self.n_classes), dtype=np.float32)])
+
+    def predict(self, features):
+        """Class probabilities for a float32 feature matrix"""
+        margins = self.predict_margin(features)
+        # XGBoost's softmax: float exponentials shifted by the row max, summed in double
+        shifted = margins - margins.max(axis=1, keepdims=True)
+        exps = float32_exp(shifted)
+        total = np.zeros(len(exps), dtype=np.float64)
+        for k in range(self.n_classes):
+            total += exps[:, k]
+        return exps / total.astype(np.float32)[:, None]
+
+
+def validation_matrix(compiled, n_features, rows=4096, seed=0):
+    """Random rows built from split thresholds, values just below them and NaN"""
+    rng = np.random.default_rng(seed)
+    is_split = compiled.children[1::2] != np.arange(0, len(compiled.feature), 2)
+    columns = []
+    for f in range(n_features):
+        thresholds = np.unique(compiled.threshold[::2][is_split & (compiled.feature[::2] == f)])
+        candidates = np.concatenate([
+            thresholds,
+            np.nextafter(thresholds, np.float32(-np.inf)),
+            np.array([np.nan, -1e6, 1e6, 0.0], dtype=np.float32)
+        ]).astype(np.float32)
+        columns.append(rng.choice(candidates, size=rows))
+    return np.stack(columns, axis=1).astype(np.float32)
+
+
+def compile_booster(booster):
+    """Compile a booster and check it reproduces XGBoost's output exactly
+
+    Raises ValueError if the compiled margins or probabilities differ from the
+    booster's in any bit, so callers can keep using XGBoost instead.
+    """
+    compiled = CompiledEnsemble.from_booster(booster)
+    features = validation_matrix(compiled, booster.num_features())
+
+    expected_margin = booster.inplace_predict(features, predict_type='margin', validate_features=False)
+    expected_proba = booster.inplace_predict(features, validate_features=False)
+    margin = compiled.predict_margin(features)
+    proba = compiled.predict(features)
+
+    if not np.array_equal(np.asarray(expected_margin, dtype=np.float32).view(np.uint32), margin.view(np.uint32)):
+        raise ValueError("Compiled margins differ from XGBoost")
+    if not np.array_equal(np.asarray(expected_proba, dtype=np.float32).view(np.uint32), proba.view(np.uint32)):
+        raise ValueError("Compiled probabilities differ from XGBoost")
+
+    logger.info(f"Compiled {len(compiled.roots)} trees ({len(compiled.feature)} nodes, "
+                f"depth {compiled.max_depth}), verified on {len(features)} rows")
+    return compiled
@@ -0,0 +1,229 @@
+"""
+Pooled HTTP client for the Flask ML service
+
+Every worker process keeps one requests.Session with a bounded keep-alive
+connection pool, so proxied calls reuse open connections to the prediction
+service instead of paying TCP setup on each request. Calls go through a
+per-process circuit breaker, so a slow or failing service costs callers a fast
+503 instead of a blocked worker.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Flask ML service URL - use Docker service name when in containers
+FLASK_ML_SERVICE_URL = os.getenv('PREDICTION_SERVICE_URL', "http://prediction-service:5001")
+
+# Seconds to establish a connection; read timeouts are set per endpoint by the caller
+CONNECT_TIMEOUT = float(os.getenv('PREDICTION_CONNECT_TIMEOUT', '3'))
+# Idle connections kept open per worker; concurrent requests beyond this open
+# short-lived extra connections instead of waiting
+POOL_MAXSIZE = int(os.getenv('PREDICTION_POOL_MAXSIZE', '10'))
+
+# Circuit breaker: open once this share of the last BREAKER_WINDOW calls failed or
+# took longer than BREAKER_SLOW_SECONDS, then probe /health every BREAKER_RESET_SECONDS
+BREAKER_WINDOW = int(os.getenv('PREDICTION_BREAKER_WINDOW', '20'))
+BREAKER_MIN_CALLS = int(os.getenv('PREDICTION_BREAKER_MIN_CALLS', '5'))
+BREAKER_FAILURE_RATE = float(os.getenv('PREDICTION_BREAKER_FAILURE_RATE', '0.5'))
+BREAKER_SLOW_SECONDS = float(os.getenv('PREDICTION_BREAKER_SLOW_SECONDS', '5'))
+# Batches legitimately take longer, so they get their own slow-call threshold
+BREAKER_BATCH_SLOW_SECONDS = float(os.getenv('PREDICTION_BREAKER_BATCH_SLOW_SECONDS', '30'))
+SLOW_SECONDS_BY_PATH = {'/predict/batch': BREAKER_BATCH_SLOW_SECONDS}
+BREAKER_RESET_SECONDS = float(os.getenv('PREDICTION_BREAKER_RESET_SECONDS', '15'))
+BREAKER_PROBE_TIMEOUT = 5
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_breaker = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without calling the service while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Fail fast while the prediction service is failing or slow
+
+    Errors, 5xx responses and calls slower than slow_seconds (or the threshold
+    passed to record) count as failures. Once at least min_calls of the last
+    window calls are recorded and failure_rate of them failed, the breaker opens
+    and every call is rejected at once. A background thread then probes the
+    service every reset_seconds. While a probe runs the breaker is half-open:
+    the probe is the only call that reaches the service, and requests are still
+    rejected. The first successful probe closes the breaker again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, probe, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 failure_rate=BREAKER_FAILURE_RATE, slow_seconds=BREAKER_SLOW_SECONDS,
+                 reset_seconds=BREAKER_RESET_SECONDS):
+        self.probe = probe
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_seconds = slow_seconds
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = None
+        self.last_failure = None
+        self.trips = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless the breaker is closed"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            self.rejected += 1
+            state = self.state
+        raise CircuitOpenError(f"Prediction service circuit is {state}, failing fast")
+
+    def record(self, ok, elapsed, error=None, slow_seconds=None):
+        """Record the outcome of a call, opening the breaker if the thresholds are crossed"""
+        if ok and elapsed > (slow_seconds or self.slow_seconds):
+            ok, error = False, f"Slow response: {elapsed:.2f}s"
+        with self._lock:
+            if self.state != self.CLOSED:
+                return
+            self.outcomes.append(not ok)
+            if not ok:
+                self.last_failure = error
+            failures = sum(self.outcomes)
+            if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_rate:
+                self._open(failures)
+
+    def _open(self, failures):
+        self.state = self.OPEN
+        self.opened_at = time.time()
+        self.trips += 1
+        logger.warning(f"Prediction service circuit opened after {failures} of {len(self.outcomes)} "
+                       f"calls failed, last: {self.last_failure}")
+        self.outcomes.clear()
+        threading.Thread(target=self._probe_until_closed, name='prediction-breaker-probe',
+                         daemon=True).start()
+
+    def _probe_until_closed(self):
+        while True:
+            time.sleep(self.reset_seconds)
+            with self._lock:
+                self.state = self.HALF_OPEN
+            try:
+                ok = self.probe()
+            except Exception as e:
+                logger.debug(f"Prediction service probe failed: {e}")
+                ok = False
+            with self._lock:
+                if ok:
+                    self.state = self.CLOSED
+                    self.opened_at = None
+                    logger.info("Prediction service circuit closed after a successful probe")
+                    return
+                self.state = self.OPEN
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "opened_at": datetime.fromtimestamp(self.opened_at).isoformat() if self.opened_at else None,
+                "recent_calls": len(self.outcomes),
+                "recent_failures": sum(self.outcomes),
+                "last_failure": self.last_failure,
+                "trips": self.trips,
+                "rejected_calls": self.rejected,
+                "failure_rate_threshold": self.failure_rate,
+                "slow_call_seconds": self.slow_seconds,
+                "slow_call_seconds_by_path": SLOW_SECONDS_BY_PATH,
+                "reset_seconds": self.reset_seconds
+            }
+
+
+def _build_session():
+    session = requests.Session()
+    # A single upstream host, so one pool; no retries since predictions are proxied as-is
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _probe_health():
+    response = get_session().get(
+        f"{FLASK_ML_SERVICE_URL}/health",
+        timeout=(CONNECT_TIMEOUT, BREAKER_PROBE_TIMEOUT)
+    )
+    return response.status_code == 200
+
+
+def _ensure_process_state():
+    """Build the session and breaker once per process, again after a fork"""
+    global _session, _breaker, _session_pid
+    pid = os.getpid()
+    if _session_pid != pid:
+        with _session_lock:
+            if _session_pid != pid:
+                _session = _build_session()
+                _breaker = CircuitBreaker(_probe_health)
+                _session_pid = pid
+
+
+def get_session():
+    """The worker's shared session, rebuilt after a fork so processes never share sockets"""
+    _ensure_process_state()
+    return _session
+
+
+def get_breaker():
+    """The worker's circuit breaker"""
+    _ensure_process_state()
+    return _breaker
+
+
+def breaker_stats():
+    return get_breaker().stats()
+
+
+def _request(method, path, read_timeout, **kwargs):
+    breaker = get_breaker()
+    breaker.before_call()
+    slow_seconds = SLOW_SECONDS_BY_PATH.get(path)
+    start = time.perf_counter()
+    try:
+        response = get_session().request(
+            method,
+            f"{FLASK_ML_SERVICE_URL}{path}",
+            timeout=(CONNECT_TIMEOUT, read_timeout),
+            **kwargs
+        )
+    except requests.exceptions.RequestException as e:
+        breaker.record(False, time.perf_counter() - start, str(e), slow_seconds)
+        raise
+    breaker.record(response.status_code < 500, time.perf_counter() - start,
+                   f"HTTP {response.status_code}", slow_seconds)
+    return response
+
+
+def post(path, payload, read_timeout, stream=False):
+    """POST a JSON payload to the prediction service
+
+    With stream=True the body is read as it arrives; the caller must close the response.
+    """
+    return _request('POST', path, read_timeout, json=payload, stream=stream)
+
+
+def get(path, read_timeout):
+    """GET from the prediction service"""
+    return _request('GET', path, read_timeout)
@@ -7,16 +7,165 @@ import requests
 import json
 import os
 from django.conf import settings
+import prediction_client
+from proxy_cache import (
+    SingleFlight, cache_available, cache_get, cache_get_many, cache_key, cache_set,
+    cache_set_many, compute_etag, etag_matches, payload_cache_key
+)
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from django.http import StreamingHttpResponse
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Flask ML service URL - use Docker service name when in containers
-FLASK_ML_SERVICE_URL = os.getenv('PREDICTION_SERVICE_URL', "http://prediction-service:5001")
+# /info only changes when the service loads another model, so it is cached per model
+# version; the version itself comes from /health, which is cached briefly
+INFO_CACHE_SECONDS = int(os.getenv('PREDICTION_INFO_CACHE_SECONDS', '86400'))
+HEALTH_CACHE_SECONDS = int(os.getenv('PREDICTION_HEALTH_CACHE_SECONDS', '10'))
+# Scored records, shared by every worker and instance, keyed on the record and model version
+PREDICTION_CACHE_SECONDS = int(os.getenv('PREDICTION_CACHE_SECONDS', '3600'))
+# Fields of a scored record that are cached; the input echo and batch index are rebuilt per request
+PREDICTION_FIELDS = ('prediction', 'confidence', 'probabilities')
+# Concurrent identical predictions share one upstream call; other workers wait this
+# long for it before calling the service themselves
+COALESCE_WAIT_SECONDS = float(os.getenv('PREDICTION_COALESCE_WAIT_SECONDS', '10'))
+
+# The lock outlives the slowest upstream call (30s read timeout), so it only
+# expires on its own if its holder died
+prediction_flight = SingleFlight(wait_seconds=COALESCE_WAIT_SECONDS, lock_seconds=60)
+
+def conditional_response(request, data, weak_etag_source=None):
+    """200 with an ETag, or 304 if the client already has this representation
+
+    With weak_etag_source the ETag is weak and computed from that instead of the
+    whole body, for bodies that carry counters which change on every request.
+    """
+    etag = compute_etag(data) if weak_etag_source is None else 'W/' + compute_etag(weak_etag_source)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag_matches(request, headers['ETag']):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+def get_service_health():
+    """The service's /health payload shared across workers, or None if it is unhealthy"""
+    key = cache_key('health')
+    payload = cache_get(key)
+    if payload is None:
+        response = prediction_client.get('/health', read_timeout=5)
+        if response.status_code != 200:
+            return None
+        payload = response.json()
+        cache_set(key, payload, HEALTH_CACHE_SECONDS)
+    return payload
+
+def get_model_version():
+    """Version of the model the service is serving, or None if unknown"""
+    health = get_service_health()
+    return health.get('model_version') if health else None
+
+def remember_model_version(model_version):
+    """Record the version a service worker just scored with, for the next cache lookups"""
+    if model_version:
+        cache_set(cache_key('model_version'), model_version, HEALTH_CACHE_SECONDS)
+
+def prediction_cache_version():
+    """Model version to look cached predictions up under, or None to bypass the cache
+
+    Lookups use the version the service last scored with, else the /health one.
+    Writes are always keyed on the version in the scoring response, since
+    service workers reload on their own schedule and either may be stale.
+    """
+    if not cache_available():
+        return None
+    return cache_get(cache_key('model_version')) or get_model_version()
+
+def cached_prediction(result, model_version):
+    return {**{field: result[field] for field in PREDICTION_FIELDS}, 'model_version': model_version}
+
+def service_unavailable(details):
+    return Response({
+        'error': 'Prediction service unavailable',
+        'details': details
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+def prediction_unavailable(response):
+    return service_unavailable(response.text)
+
+def fetch_prediction(record):
+    """Score one record upstream and cache it; returns (cached fields, None) or (None, error details)
+
+    The error details are plain text, so the single flight can publish them
+    to the requests waiting in other workers.
+
+    The result is cached under the model version the service reports for it.
+    If that is not the version it was looked up under, the single-flight key
+    gets no result and waiters fetch for themselves.
+    """
+    response = prediction_client.post('/predict', record, read_timeout=30)
+    if response.status_code != 200:
+        return None, response.text
+    payload = response.json()
+    model_version = payload.get('model_version')
+    result = cached_prediction(payload, model_version)
+    if model_version:
+        remember_model_version(model_version)
+        cache_set(payload_cache_key('prediction', model_version, record), result, PREDICTION_CACHE_SECONDS)
+    return result, None
+
+def forward_batch(payload):
+    """Forward a batch request to the service unchanged"""
+    response = prediction_client.post('/predict/batch', payload, read_timeout=60)
+    
+    if response.status_code == 200:
+        return Response(response.json(), status=status.HTTP_200_OK)
+    else:
+        return prediction_unavailable(response)
+
+def stream_batch(payload):
+    """Relay a streamed (NDJSON) batch line by line as the service scores it"""
+    response = prediction_client.post('/predict/batch', payload, read_timeout=60, stream=True)
+    if response.status_code != 200:
+        return prediction_unavailable(response)
+    
+    def relay():
+        try:
+            for line in response.iter_lines(chunk_size=None):
+                if line:
+                    yield line + b'\n'
+        except requests.exceptions.RequestException as e:
+            # Headers are already sent, so report the failure as the last line, like the service
+            logger.error(f"Streamed batch from prediction service broke off: {str(e)}")
+            yield json.dumps({'error': f'Prediction service stream broke off: {str(e)}'}).encode() + b'\n'
+        finally:
+            response.close()
+    
+    return StreamingHttpResponse(relay(), content_type='application/x-ndjson')
+
+def forward_and_cache_batch(payload, data_list, rows):
+    """Score data_list[rows] upstream and cache the results under the version that scored them
+
+    Returns (results by row, model version, None) or (None, None, failed response).
+    """
+    response = prediction_client.post(
+        '/predict/batch', {**payload, 'data': [data_list[i] for i in rows]}, read_timeout=60
+    )
+    if response.status_code != 200:
+        return None, None, response
+    body = response.json()
+    model_version = body.get('model_version')
+    # Indices in the response refer to the forwarded records
+    scored = {rows[result['index']]: result for result in body['results']}
+    if model_version:
+        remember_model_version(model_version)
+        cache_set_many({
+            payload_cache_key('prediction', model_version, data_list[i]): cached_prediction(result, model_version)
+            for i, result in scored.items()
+            if isinstance(data_list[i], dict) and 'error' not in result
+        }, PREDICTION_CACHE_SECONDS)
+    return scored, model_version, None
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -26,21 +175,24 @@ def predict_disease(request):
     Forwards requests to Flask ML service
     """
     try:
+        model_version = prediction_cache_version() if isinstance(request.data, dict) else None
+        if model_version:
+            key = payload_cache_key('prediction', model_version, request.data)
+            cached = cache_get(key)
+            if cached is None:
+                # Concurrent identical requests, in any worker, share one upstream call
+                cached, failed = prediction_flight.do(key, lambda: fetch_prediction(request.data))
+                if failed is not None:
+                    return service_unavailable(failed)
+            return Response({**cached, 'input_data': request.data}, status=status.HTTP_200_OK)
+        
         # Forward request to Flask service
-        response = requests.post(
-            f"{FLASK_ML_SERVICE_URL}/predict",
-            json=request.data,
-            headers={'Content-Type': 'application/json'},
-            timeout=30
-        )
+        response = prediction_client.post('/predict', request.data, read_timeout=30)
         
         if response.status_code == 200:
             return Response(response.json(), status=status.HTTP_200_OK)
         else:
-            return Response({
-                'error': 'Prediction service unavailable',
-                'details': response.text
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            return prediction_unavailable(response)
             
     except requests.exceptions.RequestException as e:
         logger.error(f"Error calling prediction service: {str(e)}")
@@ -60,17 +212,90 @@ def predict_disease(request):
 def predict_batch(request):
     """
     Proxy endpoint for batch disease prediction
+    Cached records are answered from Redis, only the rest are forwarded
     """
     try:
-        response = requests.post(
-            f"{FLASK_ML_SERVICE_URL}/predict/batch",
-            json=request.data,
-            headers={'Content-Type': 'application/json'},
-            timeout=60
-        )
+        data_list = request.data.get('data') if isinstance(request.data, dict) else None
+        if isinstance(request.data, dict) and request.data.get('stream') is True:
+            return stream_batch(request.data)
+        # Malformed requests are passed through for the service to report
+        model_version = prediction_cache_version() if isinstance(data_list, list) else None
+        if not model_version:
+            return forward_batch(request.data)
+        
+        keys = [
+            payload_cache_key('prediction', model_version, record) if isinstance(record, dict) else None
+            for record in data_list
+        ]
+        cached = cache_get_many([key for key in keys if key is not None])
+        misses = [i for i, key in enumerate(keys) if key not in cached]
+        
+        scored = {}
+        if misses:
+            # Forward each distinct missing record once
+            forwarded = {}
+            for i in misses:
+                forwarded.setdefault(keys[i] if keys[i] is not None else i, i)
+            scored, scored_version, failed = forward_and_cache_batch(
+                request.data, data_list, list(forwarded.values())
+            )
+            if failed is not None:
+                return prediction_unavailable(failed)
+            if scored_version != model_version and len(misses) < len(data_list):
+                # The service moved to another model since the lookup: score every record
+                # with it, so the response never mixes two model versions
+                scored, scored_version, failed = forward_and_cache_batch(
+                    request.data, data_list, list(range(len(data_list)))
+                )
+                if failed is not None:
+                    return prediction_unavailable(failed)
+                misses = list(range(len(data_list)))
+            model_version = scored_version
+            for i in misses:
+                if i not in scored:
+                    scored[i] = dict(scored[forwarded[keys[i]]])
+        
+        include_input = request.data.get('include_input', True) is not False
+        results = []
+        for i, record in enumerate(data_list):
+            if i in scored:
+                result = scored[i]
+                result['index'] = i
+            else:
+                result = {'index': i, **cached[keys[i]]}
+                result.pop('model_version', None)
+                if include_input:
+                    result['input_data'] = record
+            results.append(result)
+        
+        return Response({
+            'results': results,
+            'total_predictions': len(results),
+            'successful_predictions': len([r for r in results if 'error' not in r]),
+            'model_version': model_version
+        }, status=status.HTTP_200_OK)
+            
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error calling batch prediction service: {str(e)}")
+        return Response({
+            'error': 'Failed to connect to prediction service',
+            'details': str(e)
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def predict_grid(request):
+    """
+    Proxy endpoint for the location x week risk grid
+    One call replaces a /predict request per location
+    """
+    try:
+        response = prediction_client.post('/predict/grid', request.data, read_timeout=30)
         
         if response.status_code == 200:
             return Response(response.json(), status=status.HTTP_200_OK)
+        elif response.status_code == 400:
+            return Response(response.json(), status=status.HTTP_400_BAD_REQUEST)
         else:
             return Response({
                 'error': 'Prediction service unavailable',
@@ -78,7 +303,7 @@ def predict_batch(request):
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
             
     except requests.exceptions.RequestException as e:
-        logger.error(f"Error calling batch prediction service: {str(e)}")
+        logger.error(f"Error calling grid prediction service: {str(e)}")
         return Response({
             'error': 'Failed to connect to prediction service',
             'details': str(e)
@@ -91,13 +316,19 @@ def prediction_info(request):
     Get prediction model information
     """
     try:
-        response = requests.get(
-            f"{FLASK_ML_SERVICE_URL}/info",
-            timeout=10
-        )
+        # Without Redis there is nothing to look the version up for
+        model_version = get_model_version() if cache_available() else None
+        payload = cache_get(cache_key('info', model_version)) if model_version else None
+        if payload is not None:
+            return conditional_response(request, payload)
+        
+        response = prediction_client.get('/info', read_timeout=10)
         
         if response.status_code == 200:
-            return Response(response.json(), status=status.HTTP_200_OK)
+            payload = response.json()
+            # Key on the version /info reports, which is current even if /health was stale
+            cache_set(cache_key('info', payload.get('model_version')), payload, INFO_CACHE_SECONDS)
+            return conditional_response(request, payload)
         else:
             return Response({
                 'error': 'Prediction service unavailable'
@@ -116,24 +347,25 @@ def prediction_health_check(request):
     Health check for prediction service
     """
     try:
-        response = requests.get(
-            f"{FLASK_ML_SERVICE_URL}/health",
-            timeout=5
-        )
+        service_health = get_service_health()
         
-        if response.status_code == 200:
-            return Response({
+        if service_health is not None:
+            breaker = prediction_client.breaker_stats()
+            return conditional_response(request, {
                 'status': 'healthy',
-                'prediction_service': response.json()
-            }, status=status.HTTP_200_OK)
+                'prediction_service': service_health,
+                'circuit_breaker': breaker
+            }, weak_etag_source=[service_health, breaker['state'], breaker['trips']])
         else:
             return Response({
                 'status': 'unhealthy',
-                'error': 'Prediction service not responding'
+                'error': 'Prediction service not responding',
+                'circuit_breaker': prediction_client.breaker_stats()
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
             
     except requests.exceptions.RequestException as e:
         return Response({
             'status': 'unhealthy',
-            'error': f'Cannot connect to prediction service: {str(e)}'
+            'error': f'Cannot connect to prediction service: {str(e)}',
+            'circuit_breaker': prediction_client.breaker_stats()
         }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
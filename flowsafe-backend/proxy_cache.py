@@ -0,0 +1,250 @@
+"""
+Redis-backed caching helpers for the prediction proxy
+
+Wraps Django's default cache (django_redis). An unreachable Redis is never an
+error for callers: reads behave as misses and writes are skipped. After a
+failure the cache is bypassed for a few seconds, so requests do not each wait
+for the socket timeout while Redis is down.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.utils.http import parse_etags, quote_etag
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'prediction_proxy'
+# Seconds to skip the cache after Redis fails
+BYPASS_SECONDS = 5
+
+_bypass_until = 0.0
+
+# Delete a lock only if it still holds the caller's token, in one atomic step
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def cache_key(*parts):
+    return ':'.join((CACHE_PREFIX,) + tuple(str(part) for part in parts))
+
+
+def cache_available():
+    """False while the cache is bypassed after a Redis failure"""
+    return time.monotonic() >= _bypass_until
+
+
+def _failed(operation, error):
+    global _bypass_until
+    _bypass_until = time.monotonic() + BYPASS_SECONDS
+    logger.warning(f"Redis cache {operation} failed, bypassing the cache for {BYPASS_SECONDS}s: {error}")
+
+
+def cache_get(key, default=None):
+    if not cache_available():
+        return default
+    try:
+        return cache.get(key, default)
+    except Exception as e:
+        _failed('get', e)
+        return default
+
+
+def cache_set(key, value, timeout):
+    if not cache_available():
+        return
+    try:
+        cache.set(key, value, timeout)
+    except Exception as e:
+        _failed('set', e)
+
+
+def acquire_lock(key, token, timeout):
+    """Take a lock that expires after timeout seconds (Redis SET NX PX)
+
+    Returns True if it was taken, False if another holder has it and None if
+    Redis is unavailable.
+    """
+    if not cache_available():
+        return None
+    try:
+        return bool(get_redis_connection('default').set(
+            cache.make_key(key), token, nx=True, px=int(timeout * 1000)
+        ))
+    except Exception as e:
+        _failed('lock', e)
+        return None
+
+
+def release_lock(key, token):
+    """Release a lock taken with token, unless it expired and another holder took it"""
+    if not cache_available():
+        return
+    try:
+        get_redis_connection('default').eval(RELEASE_LOCK_SCRIPT, 1, cache.make_key(key), token)
+    except Exception as e:
+        _failed('unlock', e)
+
+
+def cache_get_many(keys):
+    """Dict of the keys that are cached, in one round trip"""
+    if not keys or not cache_available():
+        return {}
+    try:
+        return cache.get_many(keys)
+    except Exception as e:
+        _failed('get_many', e)
+        return {}
+
+
+def cache_set_many(mapping, timeout):
+    if not mapping or not cache_available():
+        return
+    try:
+        cache.set_many(mapping, timeout)
+    except Exception as e:
+        _failed('set_many', e)
+
+
+def canonical_json(data):
+    """JSON with sorted keys and no whitespace, so equal payloads serialize identically"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def payload_cache_key(namespace, model_version, payload):
+    """Key for a JSON payload scored by a given model version"""
+    digest = hashlib.sha256(canonical_json(payload).encode()).hexdigest()
+    return cache_key(namespace, model_version, digest)
+
+
+def compute_etag(data):
+    return quote_etag(hashlib.sha256(canonical_json(data).encode()).hexdigest()[:32])
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(request, etag):
+    """True if the request's If-None-Match names this ETag (weak comparison)"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or any(_strip_weak(tag) == _strip_weak(etag) for tag in etags)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent identical fetches into one upstream call
+
+    Within a process, callers with the same key wait for the first caller's
+    result (or exception). Across processes, the caller that takes the key's
+    Redis lock fetches. The lock holds a random token and is released with an
+    atomic compare-and-delete, so a holder whose lock expired never releases
+    the next holder's. The others poll, with exponential backoff and jitter,
+    for the result the fetch stores or a failure it publishes. They fetch
+    themselves if the lock is released without either, or after wait_seconds.
+    The lock expires after lock_seconds, in case its holder dies.
+
+    fetch() must store its result in the cache under key when it succeeds and
+    return (value, failure). A failure is published for failure_seconds, so it
+    must be picklable; waiters in other processes get (cached value, None) or
+    (None, published failure).
+    """
+
+    def __init__(self, wait_seconds, lock_seconds, failure_seconds=2,
+                 poll_seconds=0.01, max_poll_seconds=0.25):
+        self.wait_seconds = wait_seconds
+        self.lock_seconds = lock_seconds
+        self.failure_seconds = failure_seconds
+        self.poll_seconds = poll_seconds
+        self.max_poll_seconds = max_poll_seconds
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fetch):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._fetch_once(key, fetch)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _fetch_once(self, key, fetch):
+        lock_key = f"{key}:lock"
+        failure_key = f"{key}:failure"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_seconds
+        delay = self.poll_seconds
+        while True:
+            acquired = acquire_lock(lock_key, token, self.lock_seconds)
+            if acquired is None:
+                # Redis is unavailable, so there is nothing to coordinate with
+                return fetch()
+            if acquired:
+                try:
+                    # The previous holder may have published its outcome since the caller looked
+                    published = self._published(key, failure_key)
+                    if published is not None:
+                        return published
+                    value, failure = fetch()
+                    if failure is not None:
+                        # Waiters answer with the same failure instead of each retrying upstream
+                        cache_set(failure_key, failure, self.failure_seconds)
+                    return value, failure
+                finally:
+                    release_lock(lock_key, token)
+
+            published = self._published(key, failure_key)
+            if published is not None:
+                return published
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(f"Gave up waiting for the fetch of {key} in another worker")
+                return fetch()
+            time.sleep(min(random.uniform(delay / 2, delay), remaining))
+            delay = min(delay * 2, self.max_poll_seconds)
+
+    @staticmethod
+    def _published(key, failure_key):
+        """(value, None) or (None, failure) if a fetch has published one, else None"""
+        found = cache_get_many([key, failure_key])
+        if key in found:
+            return found[key], None
+        if failure_key in found:
+            return None, found[failure_key]
+        return None
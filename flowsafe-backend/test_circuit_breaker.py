@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Check the state changes of the prediction service circuit breaker
+
+Run with pytest or directly: python test_circuit_breaker.py
+"""
+
+import threading
+import time
+
+from prediction_client import CircuitBreaker, CircuitOpenError
+
+
+def make_breaker(probe=lambda: True, **kwargs):
+    options = dict(window=4, min_calls=4, failure_rate=0.5, slow_seconds=1.0, reset_seconds=0.05)
+    options.update(kwargs)
+    return CircuitBreaker(probe, **options)
+
+
+def wait_for_state(breaker, state, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while breaker.state != state and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return breaker.state
+
+
+def assert_rejects(breaker):
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        return
+    raise AssertionError(f"Call allowed while the breaker is {breaker.state}")
+
+
+def test_opens_at_the_failure_rate():
+    breaker = make_breaker(reset_seconds=60)
+    for ok in (True, True, False):
+        breaker.record(ok, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(False, 0.1, "HTTP 503")
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert_rejects(breaker)
+    stats = breaker.stats()
+    assert (stats["trips"], stats["rejected_calls"], stats["last_failure"]) == (1, 1, "HTTP 503")
+
+
+def test_needs_min_calls_before_opening():
+    breaker = make_breaker(reset_seconds=60)
+    for _ in range(3):
+        breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_slow_calls_fail_against_their_own_threshold():
+    breaker = make_breaker(reset_seconds=60)
+    # Slow for the default threshold, fast for a batch threshold
+    for _ in range(4):
+        breaker.record(True, 2.0, slow_seconds=30.0)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    for _ in range(4):
+        breaker.record(True, 2.0)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.last_failure == "Slow response: 2.00s"
+
+
+def test_rejects_while_half_open_and_closes_after_a_successful_probe():
+    probe_started, release_probe = threading.Event(), threading.Event()
+
+    def probe():
+        probe_started.set()
+        release_probe.wait(2)
+        return True
+
+    breaker = make_breaker(probe)
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    assert probe_started.wait(2)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert_rejects(breaker)
+
+    release_probe.set()
+    assert wait_for_state(breaker, CircuitBreaker.CLOSED) == CircuitBreaker.CLOSED
+    breaker.before_call()
+    assert breaker.stats()["recent_calls"] == 0
+
+
+def test_stays_open_while_probes_fail():
+    results = [False, False, True]
+    calls = []
+
+    def probe():
+        calls.append(1)
+        return results[len(calls) - 1]
+
+    breaker = make_breaker(probe, reset_seconds=0.02)
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    assert wait_for_state(breaker, CircuitBreaker.CLOSED) == CircuitBreaker.CLOSED
+    assert len(calls) == 3
+
+
+if __name__ == "__main__":
+    test_opens_at_the_failure_rate()
+    print("✓ The breaker opens at the failure rate and rejects calls")
+    test_needs_min_calls_before_opening()
+    print("✓ The breaker needs min_calls before it can open")
+    test_slow_calls_fail_against_their_own_threshold()
+    print("✓ Slow calls are judged against their own threshold")
+    test_rejects_while_half_open_and_closes_after_a_successful_probe()
+    print("✓ Calls are rejected while half-open, and a successful probe closes the breaker")
+    test_stays_open_while_probes_fail()
+    print("✓ The breaker stays open until a probe succeeds")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Check how the prediction proxy caches records in Redis and merges batches
+
+Runs against fakeredis (see conftest.py) with the prediction service
+replaced by an in-process fake that records what it is sent.
+
+Run with pytest: python -m pytest test_prediction_proxy.py
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('django_redis')
+pytest.importorskip('rest_framework')
+
+RECORD = {
+    "Week": "2025-W23", "Location": "Dwarka", "NDVI": 0.3, "WaterIndex": 0.7, "Rainfall_mm": 120,
+    "FeverCases": 30, "Humidity_pct": 80, "ToiletUsage_pct": 70, "Absenteeism_pct": 8
+}
+A, B, C = (dict(RECORD, FeverCases=fever) for fever in (10, 20, 30))
+INVALID = dict(RECORD, FeverCases="many")
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+        self.text = str(body)
+
+    def json(self):
+        return self.body
+
+
+class FakeService:
+    """Scores a record as '<model version>:<FeverCases>' and rejects non-numeric FeverCases"""
+
+    def __init__(self):
+        self.model_version = 'v1'
+        self.status_code = 200
+        self.calls = []
+
+    def score(self, record):
+        if not isinstance(record, dict) or not isinstance(record.get('FeverCases'), (int, float)):
+            return {'error': 'Invalid numeric value for FeverCases', 'input_data': record}
+        return {
+            'prediction': f"{self.model_version}:{record['FeverCases']}",
+            'confidence': 0.9,
+            'probabilities': {'Dengue': 0.9, 'Cholera': 0.1},
+            'input_data': record
+        }
+
+    def get(self, path, read_timeout):
+        return FakeResponse(200, {'status': 'healthy', 'model_version': self.model_version})
+
+    def post(self, path, payload, read_timeout, stream=False):
+        self.calls.append((path, payload))
+        if self.status_code != 200:
+            return FakeResponse(self.status_code, {'error': 'Model not loaded'})
+        if path == '/predict':
+            return FakeResponse(200, {**self.score(payload), 'model_version': self.model_version})
+        results = [{'index': i, **self.score(record)} for i, record in enumerate(payload['data'])]
+        return FakeResponse(200, {
+            'results': results,
+            'total_predictions': len(results),
+            'successful_predictions': len([r for r in results if 'error' not in r]),
+            'model_version': self.model_version
+        })
+
+    def batches(self):
+        return [payload['data'] for path, payload in self.calls if path == '/predict/batch']
+
+
+@pytest.fixture
+def service(redis_cache, monkeypatch):
+    import prediction_client
+
+    fake = FakeService()
+    monkeypatch.setattr(prediction_client, 'get', fake.get)
+    monkeypatch.setattr(prediction_client, 'post', fake.post)
+    return fake
+
+
+def post(view_name, data):
+    import prediction_proxy
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    request = APIRequestFactory().post('/', data, format='json')
+    force_authenticate(request, user=SimpleNamespace(is_authenticated=True))
+    return getattr(prediction_proxy, view_name)(request)
+
+
+def predict_batch(records, **options):
+    response = post('predict_batch', {'data': records, **options})
+    assert response.status_code == 200
+    return response.data
+
+
+def cached_prediction_keys():
+    """Keys of cached records, leaving out single-flight locks and published failures"""
+    from django.core.cache import cache
+    return [key for key in cache.keys('prediction_proxy:prediction:*') if key.count(':') == 3]
+
+
+def test_duplicates_are_scored_once_and_returned_in_input_order(service):
+    body = predict_batch([A, B, A, C, B])
+
+    assert service.batches() == [[A, B, C]]
+    assert [r['index'] for r in body['results']] == [0, 1, 2, 3, 4]
+    assert [r['prediction'] for r in body['results']] == ['v1:10', 'v1:20', 'v1:10', 'v1:30', 'v1:20']
+    assert [r['input_data'] for r in body['results']] == [A, B, A, C, B]
+    assert (body['total_predictions'], body['successful_predictions'], body['model_version']) == (5, 5, 'v1')
+    assert len(cached_prediction_keys()) == 3
+
+
+def test_partial_hits_forward_only_the_misses(service):
+    predict_batch([A, B])
+    body = predict_batch([B, C, A])
+
+    assert service.batches() == [[A, B], [C]]
+    assert [r['prediction'] for r in body['results']] == ['v1:20', 'v1:30', 'v1:10']
+    assert [r['index'] for r in body['results']] == [0, 1, 2]
+    # Cached rows get their input echoed like scored ones, and no per-row model version
+    assert body['results'][0] == {'index': 0, **service.score(B)}
+    assert body['model_version'] == 'v1'
+
+    assert 'input_data' not in predict_batch([A], include_input=False)['results'][0]
+    assert len(service.batches()) == 2
+
+
+def test_invalid_and_non_dict_rows_are_merged_and_never_cached(service):
+    records = [A, INVALID, 'not a record', A]
+    body = predict_batch(records)
+
+    assert service.batches() == [[A, INVALID, 'not a record']]
+    assert [r['index'] for r in body['results']] == [0, 1, 2, 3]
+    assert ['error' in r for r in body['results']] == [False, True, True, False]
+    assert body['results'][2]['input_data'] == 'not a record'
+    assert body['successful_predictions'] == 2
+    assert len(cached_prediction_keys()) == 1
+
+    # Only the invalid rows are forwarded again
+    predict_batch(records)
+    assert service.batches()[-1] == [INVALID, 'not a record']
+
+
+def test_version_mismatch_rescores_the_whole_batch(service):
+    predict_batch([A])
+    service.model_version = 'v2'
+    body = predict_batch([A, B])
+
+    # The miss is scored by v2, so the cached v1 row is scored again with it
+    assert service.batches() == [[A], [B], [A, B]]
+    assert [r['prediction'] for r in body['results']] == ['v2:10', 'v2:20']
+    assert body['model_version'] == 'v2'
+
+    # Both are now cached under v2, which the next lookup uses
+    predict_batch([A, B])
+    assert len(service.batches()) == 3
+
+
+def test_single_prediction_is_cached_and_failures_are_not(service):
+    first = post('predict_disease', A)
+    second = post('predict_disease', A)
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data == {**service.score(A), 'model_version': 'v1', 'input_data': A}
+    assert [path for path, _ in service.calls] == ['/predict']
+
+    service.status_code = 503
+    failed = post('predict_disease', B)
+    assert failed.status_code == 503
+    assert failed.data['error'] == 'Prediction service unavailable'
+    assert len(cached_prediction_keys()) == 1
+
+    # The failure is only published briefly, for requests already waiting on it
+    from django.core.cache import cache
+    failures = cache.keys('prediction_proxy:prediction:*:failure')
+    assert len(failures) == 1 and 0 < cache.ttl(failures[0]) <= 2
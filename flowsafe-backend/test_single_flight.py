@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Check that the prediction proxy's single flight makes one upstream call per key
+across workers, shares failures and only releases its own lock
+
+Runs against fakeredis (see conftest.py); each SingleFlight instance stands
+in for one worker process.
+
+Run with pytest: python -m pytest test_single_flight.py
+"""
+
+import threading
+import time
+import uuid
+
+import pytest
+
+pytest.importorskip('django_redis')
+
+from proxy_cache import SingleFlight, acquire_lock, cache_key, cache_set, release_lock  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures('redis_cache')
+
+
+def new_key():
+    return cache_key('test', uuid.uuid4().hex)
+
+
+def run_workers(key, fetch, workers=4, threads=5):
+    flights = [SingleFlight(wait_seconds=5, lock_seconds=10) for _ in range(workers)]
+    start = threading.Barrier(workers * threads)
+    results = []
+
+    def call(flight):
+        start.wait()
+        results.append(flight.do(key, fetch))
+
+    callers = [threading.Thread(target=call, args=(flight,)) for flight in flights for _ in range(threads)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    return results
+
+
+def test_one_fetch_for_concurrent_callers_in_every_worker():
+    key = new_key()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        cache_set(key, {'prediction': 'Cholera'}, 60)
+        return {'prediction': 'Cholera'}, None
+
+    results = run_workers(key, fetch)
+    assert len(calls) == 1
+    assert results == [({'prediction': 'Cholera'}, None)] * 20
+
+
+def test_failures_are_shared_with_waiting_workers():
+    key = new_key()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return None, 'Model not loaded'
+
+    results = run_workers(key, fetch)
+    assert len(calls) == 1
+    assert results == [(None, 'Model not loaded')] * 20
+
+
+def test_lock_is_only_released_by_its_holder():
+    key = new_key()
+    assert acquire_lock(key, 'first', 10) is True
+    assert acquire_lock(key, 'second', 10) is False
+
+    release_lock(key, 'second')
+    assert acquire_lock(key, 'second', 10) is False
+    release_lock(key, 'first')
+    assert acquire_lock(key, 'second', 10) is True
+    release_lock(key, 'second')
+
+
+def test_expired_holder_does_not_release_the_next_holders_lock():
+    key = new_key()
+    assert acquire_lock(key, 'first', 0.05) is True
+    time.sleep(0.1)
+    assert acquire_lock(key, 'second', 10) is True
+
+    # The first holder finishes late and releases with its own, expired token
+    release_lock(key, 'first')
+    assert acquire_lock(key, 'third', 10) is False